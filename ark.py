@@ -22,6 +22,8 @@ Project initiated: 2025.8.2
 Last updated: 2025.10.19
 """
 
+from bisect import bisect_left, insort
+
 import noah  # Import the Noah kernel, with all due ceremony.
 from noah import C
 from localize import Expression
@@ -143,7 +145,10 @@ def execute_hp_tweak(PipeData, args):
         hp_change = int(PipeData["hp_change"])
 
         if target_id in core.PlDict:
-            core.PlDict[target_id].HP += hp_change
+            pl = core.PlDict[target_id]
+            old_HP = pl.HP
+            pl.HP += hp_change
+            core.post_delta(pl, HP=old_HP)
             core.ui.out("/ark/tweak/hp/success", imp=[target_id, hp_change, core.PlDict[target_id].HP])
         else:
             core.ui.out("/ark/tweak/error/player-not-found", imp=[target_id], color="RED")
@@ -160,9 +165,12 @@ def execute_energy_tweak(PipeData, args):
         energy_change = int(PipeData["energy_change"])
 
         if target_id in core.PlDict:
-            core.PlDict[target_id].energy += energy_change
-            if core.PlDict[target_id].energy < 0:
-                core.PlDict[target_id].energy = 0
+            pl = core.PlDict[target_id]
+            old_energy = pl.energy
+            pl.energy += energy_change
+            if pl.energy < 0:
+                pl.energy = 0
+            core.post_delta(pl, energy=old_energy)
             core.ui.out("/ark/tweak/energy/success", imp=[target_id, energy_change, core.PlDict[target_id].energy])
         else:
             core.ui.out("/ark/tweak/error/player-not-found", imp=[target_id], color="RED")
@@ -179,7 +187,11 @@ def execute_place_tweak(PipeData, args):
 
         if target_id in core.PlDict:
             if abs(new_place) <= core.BattleEnv["map"]:
-                core.PlDict[target_id].place = new_place
+                pl = core.PlDict[target_id]
+                old_place = pl.place
+                pl.place = new_place
+                core.post_delta(pl, place=old_place)
+                note_move(core, pl, old_place=old_place)
                 core.ui.out("/ark/tweak/place/success", imp=[target_id, new_place])
             else:
                 core.ui.out("/ark/tweak/error/out-of-map", imp=[new_place], color="RED")
@@ -198,7 +210,11 @@ def execute_team_tweak(PipeData, args):
         NewTeamID = int(PipeData["NewTeamID"])
 
         if target_id in core.PlDict:
-            core.PlDict[target_id].team = NewTeamID
+            pl = core.PlDict[target_id]
+            old_team = pl.team
+            pl.team = NewTeamID
+            core.post_delta(pl, team=old_team)
+            note_move(core, pl, old_team=old_team)
             core.ui.out("/ark/tweak/team/success", imp=[target_id, NewTeamID, core.PlDict[target_id].HP])
         else:
             core.ui.out("/ark/tweak/error/player-not-found", imp=[target_id], color="RED")
@@ -370,19 +386,14 @@ def shot_s(pl, core, auto):
 
         if s.ai_quality == 0:
 
-            # 1. Efficiently find a target from the pre-calculated status cache.
-            shotable = []
-            for i in range(s.place - 1, s.place + 2):
-                if i in core.status["pop"]:
-                    shotable += core.status["pop"][i]["sum"]
-
-            target = pl.id
-            _tg = core.status["snap"][target]
-            # Ensure the AI doesn't target itself or a teammate.
-            while _tg[3] == pl.team and ((not pl.real) or target==pl.id):
-                target = noah.random.choice(shotable)
-                _tg = core.status["snap"][target]
-                shotable.remove(target)
+            # 1. Draw a random enemy within range from the status pool.
+            # The range is clamped to the occupied levels (see enemies_within).
+            distance = core.BattleEnv["shot_distance"]
+            index = core.status["levels"]
+            places = range(max(s.place - distance, index["lo"]), min(s.place + distance, index["hi"]) + 1)
+            target = _random_enemy(core, s, places)
+            if target is None:
+                return (True, noah.Act(pl.id, "1"))
         else:
 
             # 1. Use our helper function to find the optimal target.
@@ -433,8 +444,8 @@ def firecount(myself, PipeData, core, act, target=False):
     Helper function to calculate hits and misses for a single attacker against one or more targets.
     This can be reused by both 'Shoot' and 'Energy Wave'.
     """
-    for pos in myself.acts:
-        cur_act = core.ActSign[core.ActDict[pos[0]]["priority"]][pos[0]][pos[1]]
+    for aid in myself.acts:
+        cur_act = core.ActTable[aid]
         cur_act.pay(core)
 
         if cur_act.channel == "shot-like":
@@ -481,11 +492,55 @@ def crossfire_wave_eval(PipeData, args):
     PipeData["msg"].append(["./battle", [myself.id, myself.place, act.seth]])
     PipeData["msg"].append(["/share/endl", []])
 
-    for pl in core.PlDict.values():
-        is_target = ((pl.real and pl != myself) or myself.team != pl.team) and \
-                        get_seth(myself.place, pl.place) == act.seth
-        if is_target:
-            PipeData = firecount(myself, PipeData, core, act, pl)
+    if len(myself.acts) == 1 and core.status_live and "moves" in core.status:
+        # Only visit the levels in the wave's direction, a team bucket at a time, from the
+        # round-start "pop" patched with this round's moves (see level_buckets).
+        # The caster pays in crossfire_final.
+        shown = not core.ui.silent()
+        check_teammates = core.BattleEnv["real"] > 0  # Human teammates can be hit too.
+        index = core.status["levels"]
+        moved_out, moved_in = _moved_levels(core)
+
+        if act.seth == 0:
+            places = [myself.place]
+        elif act.seth > 0:
+            hi = max(index["hi"], max(moved_in, default=index["hi"]))
+            if not shown:
+                hi = min(hi, myself.place + act.distant)  # Misses only matter for the messages.
+            places = range(myself.place + 1, hi + 1)
+        else:
+            lo = min(index["lo"], min(moved_in, default=index["lo"]))
+            if not shown:
+                lo = max(lo, myself.place - act.distant)
+            places = range(myself.place - 1, lo - 1, -1)
+
+        hit_ids = []
+        misses = []
+        for place in places:
+            hit = abs(myself.place - place) <= act.distant
+            for team, ids in level_buckets(core, place, moved_out, moved_in):
+                if team == myself.team:
+                    if not check_teammates:
+                        continue
+                    ids = [pl_id for pl_id in ids if pl_id != myself.id and core.PlDict[pl_id].real]
+                (hit_ids if hit else misses).extend(ids)
+
+        # In PlDict order, like a scan over the players: the later steps hurt in this order.
+        hit_ids.sort()
+        PipeData["damage"] = dict.fromkeys(hit_ids, act.lv)
+
+        if shown:
+            hits = [(pl_id, True) for pl_id in hit_ids] + [(pl_id, False) for pl_id in misses]
+            hits.sort()
+            for pl_id, hit in hits:
+                key = "shot" if hit else "shot-miss"
+                PipeData["msg"].append([f"/act/{act.key}/{key}", [myself.id, pl_id, act.lv]])
+    else:
+        for pl in core.PlDict.values():
+            is_target = ((pl.real and pl != myself) or myself.team != pl.team) and \
+                            get_seth(myself.place, pl.place) == act.seth
+            if is_target:
+                PipeData = firecount(myself, PipeData, core, act, pl)
 
     PipeData["msg"].append(["/share/endl", []])
     return PipeData
@@ -498,24 +553,24 @@ def crossfire_crash(PipeData, args):
 
     for playerID in PipeData["damage"].keys():
         if playerID != attacker.id:
-            for pos in core.PlDict[playerID].acts:
-                cur_act = core.ActSign[core.ActDict[pos[0]]["priority"]][pos[0]][pos[1]]
+            # The target's actions aimed back at the attacker (or at everyone).
+            for aid in core.acts_aimed(playerID, attacker.id):
+                cur_act = core.ActTable[aid]
                 # Check if the target is also performing a shot-like action back at the attacker.
                 if cur_act.channel == "shot-like":
-                    if (cur_act.target is True or cur_act.target == attacker.id):
-                        myself = core.PlDict[playerID]
-                        is_miss = (cur_act.seth != get_seth(myself.place, attacker.place) or
-                                   abs(myself.place - attacker.place) > cur_act.distant)
-                        if is_miss:
-                            msg.append([f"/act/{cur_act.key}/shot-miss", [playerID, attacker.id, cur_act.lv]])
-                        else:
-                            # Both sides hit, projectiles crash.
-                            msg.append([f"/act/{cur_act.key}/anti", [playerID, attacker.id, cur_act.lv]])
-                            crash_amount = min(cur_act.lv, PipeData["damage"][playerID])
-                            msg.append([f"/act/{cur_act.key}/crash", [crash_amount]])
-                            PipeData["damage"][playerID] -= cur_act.lv
-
-                        cur_act.pay(core)
+                    myself = core.PlDict[playerID]
+                    is_miss = (cur_act.seth != get_seth(myself.place, attacker.place) or
+                               abs(myself.place - attacker.place) > cur_act.distant)
+                    if is_miss:
+                        msg.append([f"/act/{cur_act.key}/shot-miss", [playerID, attacker.id, cur_act.lv]])
+                    else:
+                        # Both sides hit, projectiles crash.
+                        msg.append([f"/act/{cur_act.key}/anti", [playerID, attacker.id, cur_act.lv]])
+                        crash_amount = min(cur_act.lv, PipeData["damage"][playerID])
+                        msg.append([f"/act/{cur_act.key}/crash", [crash_amount]])
+                        PipeData["damage"][playerID] -= cur_act.lv
+
+                    cur_act.pay(core)
 
     PipeData["msg"] += msg
     if msg:
@@ -573,21 +628,128 @@ def crossfire_final(PipeData, args):
         else: # Zero damage
             PipeData["msg"].append(["./peace", []])
 
-    # Display the battle log.
-    if len(PipeData["msg"]) > 1:
-        msg = PipeData["msg"].pop(0)
+    show_battle(PipeData["msg"], act, core)
+
+    core.ui.typing_delay = 0
+    act.pay(core)
+    return None
+
+def show_battle(msgs, act, core):
+    """Displays the battle log of a crossfire action: the headline, then the rest indented."""
+    if len(msgs) > 1:
+        msg = msgs.pop(0)
         core.ui.out("/share/endl")
         core.ui.out(msg[0], imp=msg[1], color=act.color)
         core.ui.indent += 1
-        for msg in PipeData["msg"]:
+        for msg in msgs:
             core.ui.out(msg[0], imp=msg[1], color=act.color)
-        if len(PipeData["msg"]) >= 4:
+        if len(msgs) >= 4:
             core.ui.out("./wonderful", color="MAGENTA")
         core.ui.indent -= 1
 
-    core.ui.typing_delay = 0
-    act.pay(core)
-    return None
+def shot_d_batch(acts, core):
+    """
+    Resolves all the 'Shoot' acts of a round together (the "d_batch" of "2").
+
+    The crossfire steps up to crossfire_defend only read places, statuses and acts, never HP,
+    so the damage of every act is worked out up front over the whole round: the hit mask from
+    `seth` and `distant`, then counter-fire crash, reflect and defend. Only the hurting is done
+    act by act, in the original order, so HP, `outd`, `HPlog` and `kills` come out the same as
+    with the pipeline. While anything can be shown or logged, the battle log of every act is
+    built from the same arrays, message for message as the crossfire steps would.
+    """
+    shown = not core.ui.silent()
+    PlDict = core.PlDict
+    ActTable = core.ActTable
+
+    pending = [act for act in acts if not act.acted]
+    shooters = [PlDict[act.ownerID] for act in pending]
+    targets = [PlDict[act.target] for act in pending]
+    places = [pl.place for pl in shooters]
+    target_places = [tg.place for tg in targets]
+
+    # Acts whose owner has more than one act go through the pipeline (see firecount).
+    simple = [len(pl.acts) == 1 for pl in shooters]
+
+    # Hit mask.
+    hits = [act.seth == get_seth(place, target_place) and abs(place - target_place) <= act.distant
+            for act, place, target_place in zip(pending, places, target_places)]
+
+    # Damage per act: None if the shot missed, negative if it is reflected back at the shooter.
+    damage = [act.lv if hit else None for act, hit in zip(pending, hits)]
+    # Battle log per act, only built while it can be shown.
+    msgs = [None] * len(pending)
+
+    for i, act in enumerate(pending):
+        if not simple[i]:
+            continue
+        attacker, tg = shooters[i], targets[i]
+        if shown:
+            msg = msgs[i] = [["./battle", [attacker.id, attacker.place, act.seth]],
+                             [f"/act/{act.key}/{'shot' if hits[i] else 'shot-miss'}", [attacker.id, tg.id, act.lv]]]
+        if damage[i] is None:
+            continue
+
+        if tg.id != attacker.id:
+            # Counter-fire from the target crashes into the shot (a lookup in Core.ActPairs).
+            countered = False
+            for aid in core.acts_aimed(tg.id, attacker.id):
+                cur_act = ActTable[aid]
+                if cur_act.channel == "shot-like":
+                    countered = True
+                    if (cur_act.seth == get_seth(tg.place, attacker.place) and
+                            abs(tg.place - attacker.place) <= cur_act.distant):
+                        if shown:
+                            msg.append([f"/act/{cur_act.key}/anti", [tg.id, attacker.id, cur_act.lv]])
+                            msg.append([f"/act/{cur_act.key}/crash", [min(cur_act.lv, damage[i])]])
+                        damage[i] -= cur_act.lv
+                    elif shown:
+                        msg.append([f"/act/{cur_act.key}/shot-miss", [tg.id, attacker.id, cur_act.lv]])
+                    cur_act.pay(core)
+            if shown and countered:
+                msg.append(["/share/endl", []])
+
+            if "reflect" in tg.status and "reflect" not in attacker.status:
+                if shown:
+                    msg.append(["./reflect", [attacker.id, damage[i]]])
+                    msg.append(["/share/endl", []])
+                damage[i] = -damage[i] if damage[i] > 0 else damage[i] * 2
+
+        if "defend" in tg.status:
+            if shown:
+                msg.append(["./defend", [tg.id, damage[i]]])
+                msg.append(["/share/endl", []])
+            if damage[i] > 0:
+                damage[i] = 0
+
+    for i, act in enumerate(pending):
+        if not simple[i]:
+            act.deal(core)
+            continue
+        act.pay(core)
+        attacker, tg = shooters[i], targets[i]
+        hurt_lv = damage[i]
+        if hurt_lv is None:
+            final = None
+        elif hurt_lv > 0:
+            tg.hurted(hurt_lv, attacker.id, act.key, core)
+            final = ["./final-hurt", [tg.id, hurt_lv, tg.HP]]
+        elif hurt_lv < 0:
+            attacker.hurted(-hurt_lv, tg.id, act.key, core)
+            final = ["./final-hurt", [attacker.id, -hurt_lv, attacker.HP]]
+        else:
+            final = ["./peace", []]
+        act.acted = True
+
+        if shown:
+            # Shown like crossfire_final would.
+            core.ui.workdir = f"/act/{act.key}"
+            if attacker.real:
+                core.ui.typing_delay = core.org_delay*3
+            if final is not None:
+                msgs[i].append(final)
+            show_battle(msgs[i], act, core)
+            core.ui.typing_delay = 0
 
 def defend_s(pl, core, auto):
     """Selection logic for the 'Defend' action."""
@@ -639,9 +801,14 @@ def move_s(pl, core, auto):
             context = {"self": s, "core": core}
             context = core.Exec("-build_able_context", "move_s", context)
 
-            current_pos_context = context.copy()
-            offense_score_current = _get_best_shot_target(current_pos_context)[1]
-            defense_score_current = predictive_defend_ai(current_pos_context)
+            # The same scores as predictive_defend_ai, read from the per-round position table.
+            # The general threat stays the one of the current place, and the HP factor of
+            # the other places is the one of a fresh noah.Player (HP 1).
+            aggression = _calculate_aggression(context)
+            base_threat = (context.get("enmK", 0.5) * context.get("engK", 0.5)) * 150 + 10
+
+            offense_score_current, threat_current = _position_score(core, s.place, s.team, s.id)
+            defense_score_current = ((base_threat + threat_current) * (2.5 / (s.HP + 0.5))) / aggression
             current_position_score = offense_score_current - (defense_score_current * 0.5)
 
             best_move_delta = 0
@@ -653,12 +820,8 @@ def move_s(pl, core, auto):
                 if abs(new_place) > core.BattleEnv["map"]:
                     continue
 
-                temp_s = noah.Player(s.id)
-                temp_s.id = s.id; temp_s.team = s.team; temp_s.place = new_place
-                temp_context = context.copy(); temp_context["self"] = temp_s
-
-                offense_score_new = _get_best_shot_target(temp_context)[1]
-                defense_score_new = predictive_defend_ai(temp_context)
+                offense_score_new, threat_new = _position_score(core, new_place, s.team, s.id)
+                defense_score_new = ((base_threat + threat_new) * (2.5 / (1 + 0.5))) / aggression
                 new_score = offense_score_new - (defense_score_new * 0.5)
 
                 if new_score > best_new_position_score:
@@ -675,10 +838,10 @@ def move_s(pl, core, auto):
             ls = list(range(-core.ActDict["4"]["step"], core.ActDict["4"]["step"] + 1))
             ls.remove(0) # AI should always move.
 
-            st = noah.random.choice(ls)
+            st = core.rng.choice(ls)
             # Ensure the move is within map boundaries.
             while abs(st + pl.place) > core.BattleEnv["map"]:
-                st = noah.random.choice(ls)
+                st = core.rng.choice(ls)
 
         act = noah.Act(pl.id, "4")
         act.steps = st
@@ -709,17 +872,9 @@ def blackhole_s(pl, core, auto):
             return (True, act)
 
         else: # AI Logic
-            available_targets = []
-            for i in core.status["pop"].keys():
-                if i != "all":
-                    available_targets += core.status["pop"][i]["sum"]
-
-            target = pl.id
-            _tg = core.status["snap"][target]
-            while _tg[3] == pl.team and ((not pl.real) or target == pl.id):
-                available_targets.remove(target)
-                target = noah.random.choice(available_targets)
-                _tg = core.status["snap"][target]
+            target = _random_enemy(core, pl, core.status["pool"].keys())
+            if target is None:
+                return (True, noah.Act(pl.id, "1"))
 
             act.target = target
             return (True, act)
@@ -746,12 +901,12 @@ def blackhole_d(PipeData, args):
         core.ui.typing_delay = core.org_delay*5
 
     # Add the target's chosen actions to their 'unable' list.
-    block = [i[0] for i in target.acts]
+    block = [core.ActTable[aid].key for aid in target.acts]
     target.unable += block
 
     # Mark the target's actions as already acted to prevent them from resolving.
-    for pos in target.acts:
-        core.ActSign[core.ActDict[pos[0]]["priority"]][pos[0]][pos[1]].acted = True
+    for aid in target.acts:
+        core.ActTable[aid].acted = True
 
     block_out = ", ".join([core.ui.get(f"/act/{i}/name") for i in block])
     core.ui.out("./result", imp=[target.id, block_out, act.ownerID])
@@ -770,6 +925,8 @@ def move_d(PipeData, args):
     st = act.steps
     pl = core.PlDict[act.ownerID]
     pl.place += st  # Perform the move.
+    core.post_delta(pl, place=pl.place - st)
+    note_move(core, pl, old_place=pl.place - st)
 
     if abs(pl.place) > core.BattleEnv["map"]:
         core.RaiseError("move_d", f"Player {pl.id} is out of map, in place {pl.place}")
@@ -914,18 +1071,7 @@ def _calculate_aggression(context: dict) -> float:
     self = context["self"]
     core = context["core"]
 
-    my_team_energy = 0
-    enemy_team_energy = 0
-    my_team_population = 0
-    enemy_team_population = 0
-
-    for pl in core.PlDict.values():
-        if pl.team == self.team:
-            my_team_energy += pl.energy
-            my_team_population += 1
-        else:
-            enemy_team_energy += pl.energy
-            enemy_team_population += 1
+    my_team_population, my_team_energy, enemy_team_population, enemy_team_energy = core.team_totals(self.team)
 
     if enemy_team_energy == 0: enemy_team_energy = 1
     if enemy_team_population == 0: enemy_team_population = 1
@@ -947,39 +1093,64 @@ def _get_best_shot_target(context):
     It returns the target player object and its calculated priority score.
     """
     s = context["self"]
-    core = context["core"]
-    best_target = None
-    max_score = -1
-
-    # Find all potential targets within one level (shot's default range)
-    shotable_players_ids = []
-    for i in range(s.place - 1, s.place + 2):
-        if i in core.status["pop"]:
-            for pl_id in core.status["pop"][i]["sum"]:
-                # Cannot target teammates (unless they are human) or self
-                if core.PlDict[pl_id].team == s.team and not core.PlDict[pl_id].real:
-                    continue
-                if pl_id == s.id:
-                    continue
-                shotable_players_ids.append(pl_id)
+    return _best_shot_target(context["core"], s.place, s.team, s.id)
 
-    if not shotable_players_ids:
-        return None, 0
 
+def _best_shot_target(core, place, team, self_id):
+    """_get_best_shot_target for a player `self_id` of `team` standing on `place`."""
+    for score, target_pl in _top_shot_targets(core, place, team):
+        if target_pl.id != self_id:
+            return target_pl, score
+    return None, 0
 
-    for target_id in shotable_players_ids:
-        target_pl = core.PlDict[target_id]
-        hp_score = 60 / (target_pl.HP + 0.1)
-        energy_score = (target_pl.energy ** 1.5) * 25
-        human_bonus = 75 if target_pl.real else 0
 
-        score = hp_score + energy_score + human_bonus
+def _top_shot_targets(core, place, team):
+    """
+    The best two targets for a player of `team` standing on `place`, as [(score, Player), ...].
+    Potential targets are within the shot's range. Who may be shot only depends on the
+    shooter's team (teammates can't be targeted unless they are human) and on not being
+    the shooter, so two are enough, and they are shared for the whole round.
+    """
+    distance = core.BattleEnv["shot_distance"]
+    # The shot's range, clamped to the occupied levels (see enemies_within).
+    index = core.status["levels"]
+    key = (max(place - distance, index["lo"]), min(place + distance, index["hi"]), team)
+    best = core.RoundCache.setdefault("best_shot_targets", {})
+    top = best.get(key)
+    if top is None:
+        top = []
+        for score, target_pl in _shot_ranking(core, key[0], key[1]):
+            if target_pl.team == team and not target_pl.real:
+                continue
+            top.append((score, target_pl))
+            if len(top) == 2:
+                break
+        best[key] = top
+    return top
 
-        if score > max_score:
-            max_score = score
-            best_target = target_pl
 
-    return best_target, max_score
+def _shot_ranking(core, lo, hi):
+    """
+    Every player standing on the levels lo..hi with their target score, best first.
+    Built once per round and window; players with the same score keep their scan order.
+    """
+    rankings = core.RoundCache.setdefault("shot_rankings", {})
+    ranking = rankings.get((lo, hi))
+    if ranking is None:
+        ranking = []
+        for i in range(lo, hi + 1):
+            if i in core.status["pop"]:
+                for pl_id in core.status["pop"][i]["sum"]:
+                    target_pl = core.PlDict[pl_id]
+                    hp_score = 60 / (target_pl.HP + 0.1)
+                    energy_score = (target_pl.energy ** 1.5) * 25
+                    human_bonus = 75 if target_pl.real else 0
+
+                    ranking.append((hp_score + energy_score + human_bonus, target_pl))
+
+        ranking.sort(key=lambda entry: -entry[0])
+        rankings[(lo, hi)] = ranking
+    return ranking
 
 
 def defend_ai(context):
@@ -1006,39 +1177,52 @@ def predictive_defend_ai(context, ignore_hp=False):
     s = context["self"]
     core = context["core"]
     base_threat = (context.get("enmK", 0.5) * context.get("engK", 0.5)) * 150 + 10
-    specific_threat = 0
-    for i in range(s.place - 1, s.place + 2):
-        if i in core.status["pop"]:
-            for pl_id in core.status["pop"][i]["sum"]:
-                if core.PlDict[pl_id].team == s.team or pl_id == s.id: continue
-                enemy_pl = core.PlDict[pl_id]
-                if enemy_pl.energy >= wave_price(None): specific_threat += 300
-                if enemy_pl.energy >= 3: specific_threat += enemy_pl.energy * 20
+    specific_threat = enemies_within(core, s.place, s.team, core.BattleEnv["shot_distance"], "threat")
     incoming_threat_score = base_threat + specific_threat
     if ignore_hp: return incoming_threat_score
     hp_multiplier = 2.5 / (s.HP + 0.5)
     final_score = incoming_threat_score * hp_multiplier
     return final_score / aggression
 
+def _position_score(core, place, team, self_id):
+    """
+    How good `place` is for player `self_id` of `team`, as (offense, threat):
+    the score of its best shot target there and the specific threat of predictive_defend_ai.
+    Both only depend on (place, team) apart from skipping the player itself, so they are
+    kept in a per-round table shared by strategic_move_ai and move_s.
+    """
+    table = core.RoundCache.setdefault("position_scores", {})
+    entry = table.get((place, team))
+    if entry is None:
+        threat = enemies_within(core, place, team, core.BattleEnv["shot_distance"], "threat")
+        entry = table[(place, team)] = (_top_shot_targets(core, place, team), threat)
+
+    top, threat = entry
+    for score, target_pl in top:
+        if target_pl.id != self_id:
+            return score, threat
+    return 0, threat
+
+
 def strategic_move_ai(context):
     aggression = _calculate_aggression(context)
     MOVE_INCENTIVE_THRESHOLD = 150
 
     s = context["self"]
     core = context["core"]
-    current_pos_context = context.copy()
-    offense_score_current = _get_best_shot_target(current_pos_context)[1]
-    defense_threat_current = predictive_defend_ai(current_pos_context, ignore_hp=True)
+    # The general threat part of predictive_defend_ai, which stays the one of the current place.
+    base_threat = (context.get("enmK", 0.5) * context.get("engK", 0.5)) * 150 + 10
+
+    offense_score_current, threat_current = _position_score(core, s.place, s.team, s.id)
+    defense_threat_current = base_threat + threat_current
     current_position_score = offense_score_current - (defense_threat_current * 0.7)
     best_new_position_score = -9999
     possible_moves = [-1, 1]
     for move_delta in possible_moves:
         new_place = s.place + move_delta
         if abs(new_place) > core.BattleEnv["map"]: continue
-        temp_s = noah.Player(s.id); temp_s.id = s.id; temp_s.team = s.team; temp_s.place = new_place
-        temp_context = context.copy(); temp_context["self"] = temp_s
-        offense_score_new = _get_best_shot_target(temp_context)[1]
-        defense_threat_new = predictive_defend_ai(temp_context, ignore_hp=True)
+        offense_score_new, threat_new = _position_score(core, new_place, s.team, s.id)
+        defense_threat_new = base_threat + threat_new
         new_score = offense_score_new - (defense_threat_new * 0.7)
         if new_score > best_new_position_score: best_new_position_score = new_score
     move_incentive = best_new_position_score - current_position_score
@@ -1068,6 +1252,69 @@ def advanced_wave_ai(context):
     base_desire = context["self"].energy * 100
     return base_desire * aggression
 
+# --- Batched counterparts ---
+# Used by noah.build_able_batch to evaluate a whole group of AI players at once.
+# Each takes the batch built by "-build_able_batch" and returns one value per player,
+# computed exactly like the per-player function it stands for.
+
+def able_forever_batch(batch):
+    return [True] * len(batch["players"])
+
+def shot_able_batch(batch):
+    return [energy >= 1 and side_enm > 0 for energy, side_enm in zip(batch["energy"], batch["side_enm"])]
+
+def move_able_batch(batch):
+    return [batch["core"].BattleEnv["map"] > 0] * len(batch["players"])
+
+def energy_at_least_batch(minimum):
+    """able_batch for the actions that only need `minimum` energy."""
+    def able(batch):
+        return [energy >= minimum for energy in batch["energy"]]
+    return able
+
+def charge_ai_batch(batch):
+    return [min((100/(energy+1))*3, 500) for energy in batch["energy"]]
+
+def advanced_charge_ai_batch(batch):
+    return [min((100/(energy+1))*3, 500) / aggression
+            for energy, aggression in zip(batch["energy"], _batch_aggression(batch))]
+
+def shot_ai_batch(batch):
+    return [energy*50 for energy in batch["energy"]]
+
+def defend_ai_batch(batch):
+    return [engK*engK*100+10 for engK in batch["engK"]]
+
+def move_ai_batch(batch):
+    return [enmK*engK*50+10 for enmK, engK in zip(batch["enmK"], batch["engK"])]
+
+def blackhole_ai_batch(batch):
+    return [energy*40 for energy in batch["energy"]]
+
+def reflect_ai_batch(batch):
+    return [engK*30+10 for engK in batch["engK"]]
+
+def wave_ai_batch(batch):
+    return [energy*100 for energy in batch["energy"]]
+
+def advanced_wave_ai_batch(batch):
+    return [energy * 100 * aggression
+            for energy, aggression in zip(batch["energy"], _batch_aggression(batch))]
+
+def _batch_aggression(batch):
+    """_calculate_aggression for every player of the batch, computed once per team."""
+    if "aggression" not in batch:
+        core = batch["core"]
+        by_team = {}
+        column = []
+        for pl in batch["players"]:
+            if pl.team not in by_team:
+                by_team[pl.team] = _calculate_aggression({"self": pl, "core": core})
+            column.append(by_team[pl.team])
+        batch["aggression"] = column
+    return batch["aggression"]
+
+
 def reflect_s(pl, core, auto):
     """Selection logic for 'Reflect'."""
     act = noah.Act(pl.id, "5")
@@ -1138,65 +1385,57 @@ def break_s(pl, core, auto):
     return (True, None)
 
 
-# Terminal check
-try:
-    from terminal_check import show_check_result
-    if not show_check_result():
-        quit()
-except ImportError:
-    pass  # Skip if module not found
-
-
 # ArkUI is the UI instance managed by the frontend, distinct from core.ui.
-# You can select a language here
-chosen_lang_code = select_language(Expression)
-noah.time.sleep(0.3)
-noah.clear_screen()
-
-chosen_lang = Expression[chosen_lang_code]
-ArkUI = noah.IO(chosen_lang, delay=float(chosen_lang['/core/typing-delay'])*0.01)
-
-ArkUI.workdir = "/ark/"
-ArkUI.out("./welcome", color="YELLOW")
+# It is created by main() once a language has been chosen, so importing
+# this module (e.g. for headless simulations) has no side effects.
+ArkUI = None
 
 # The master Action Dictionary that defines the entire game's mechanics for the Noah Kernel.
 BaseActDict = {
     "1": { # Charge
         "price": charge_price, "priority": 0, "able": able_forever,
         "human_only": False, "ai": [charge_ai, advanced_charge_ai], "weight": 1,
+        "able_batch": able_forever_batch, "ai_batch": [charge_ai_batch, advanced_charge_ai_batch],
         "s_exec": charge_s, "d_exec": [charge_d],
     },
     "2": { # Shoot
         "price": shot_price, "priority": -1, "able": shot_able,
         "human_only": False, "ai": [shot_ai, advanced_shot_ai], "weight": 1,
+        "able_batch": shot_able_batch, "ai_batch": [shot_ai_batch],
         "s_exec": shot_s,
         "d_exec": [crossfire_evaluate, crossfire_crash, crossfire_reflect, crossfire_defend, crossfire_final],
+        "d_batch": shot_d_batch,
     },
     "3": { # Defend
         "price": free_of_charge, "priority": 2, "able": able_forever,
         "human_only": False, "ai": [defend_ai, predictive_defend_ai], "weight": 1,
+        "able_batch": able_forever_batch, "ai_batch": [defend_ai_batch],
         "s_exec": defend_s, "d_exec": [defend_d],
     },
     "4": { # Move
         "price": free_of_charge, "priority": 1, "able": move_able,
         "human_only": False, "ai": [move_ai, strategic_move_ai], "weight": 1,
+        "able_batch": move_able_batch, "ai_batch": [move_ai_batch],
         "s_exec": move_s, "d_exec": [move_d],
         "step": 1 # Custom parameter for this action
     },
     "5": { # Reflect
         "price": reflect_price, "priority": 2, "able": reflect_able,
         "human_only": False, "ai": [reflect_ai, predictive_defend_ai], "weight": 1,
+        "able_batch": energy_at_least_batch(2), "ai_batch": [reflect_ai_batch],
         "s_exec": reflect_s, "d_exec": [reflect_d],
     },
     "6": { # Energy Wave
         "price": wave_price, "priority": -1, "able": wave_able,
         "human_only": False, "ai": [wave_ai, advanced_wave_ai], "weight": 1,
+        "able_batch": energy_at_least_batch(4), "ai_batch": [wave_ai_batch, advanced_wave_ai_batch],
         "s_exec": wave_s,
         "d_exec": [crossfire_wave_eval, crossfire_crash, crossfire_reflect, crossfire_defend, crossfire_final],
     },
     "7": { # Black Hole
         "price": blackhole_price, "priority": 9999, "able": blackhole_able,
         "human_only": False, "ai": [blackhole_ai], "weight": 1,
+        "able_batch": energy_at_least_batch(4), "ai_batch": [blackhole_ai_batch],
         "s_exec": blackhole_s, "d_exec": [blackhole_d],
     },
     "rl": { # Show Rules
@@ -1648,7 +1887,8 @@ def Setting():
                 OutData = noah.PipeWorkFlow(
                     PipeData=PipeData,
                     steps=steps,
-                    args=(core, ArkUI)
+                    args=(core, ArkUI),
+                    name=f"setting/{setting_key}"
                 )
             except Exception as e:
                 ArkUI.out(f"An unexpected error occurred: {e}", dr=True)
@@ -1699,15 +1939,11 @@ def build_able_enmK(PipeData, args):
     core = PipeData["core"]
 
     # --- Environment variable generation for decision making ---
-    nearby_places = range(self.place - 1, self.place + 2)
+    distance = core.BattleEnv["shot_distance"]
+    nearby_places = range(self.place - distance, self.place + distance + 1)
 
-    # --- Safer calculation of nearby enemy population ---
-    side_enm = 0
-    for i in nearby_places:
-        place_pop_stats = core.status["pop"].get(i, {})
-        total_pop_at_place = len(place_pop_stats.get("sum", []))
-        my_team_pop_at_place = len(place_pop_stats.get(self.team, []))
-        side_enm += total_pop_at_place - my_team_pop_at_place
+    # --- Nearby enemy population, from the level index ---
+    side_enm = enemies_within(core, self.place, self.team, distance)
 
     all_enm = core.status["pop"].get("all", 0)
     enmK = side_enm / all_enm if all_enm > 0 else 0 # Ratio of nearby enemies to total enemies.
@@ -1724,14 +1960,8 @@ def build_able_engK(PipeData, args):
     """Safer calculation of nearby enemy energy"""
     self = PipeData["self"]
     core = PipeData["core"]
-    nearby_places = PipeData["nearby_places"]
 
-    side_eng = 0
-    for i in nearby_places:
-        place_eng_stats = core.status["energy"].get(i, {})
-        total_eng_at_place = place_eng_stats.get("sum", 0)
-        my_team_eng_at_place = place_eng_stats.get(self.team, 0)
-        side_eng += total_eng_at_place - my_team_eng_at_place
+    side_eng = enemies_within(core, self.place, self.team, core.BattleEnv["shot_distance"], "energy")
 
     all_eng = core.status["energy"].get("all", 0)
     engK = side_eng / all_eng if all_eng > 0 else 0 # Ratio of nearby enemy energy to total enemy energy.
@@ -1741,29 +1971,75 @@ def build_able_engK(PipeData, args):
     return PipeData
 
 
+def build_batch_columns(PipeData, args):
+    """The player attributes used by the batched able/AI functions, one list per attribute."""
+    players = PipeData["players"]
+    PipeData["energy"] = [pl.energy for pl in players]
+    PipeData["place"] = [pl.place for pl in players]
+    PipeData["team"] = [pl.team for pl in players]
+    return PipeData
+
+
+def build_batch_enmK_engK(PipeData, args):
+    """build_able_enmK and build_able_engK for a whole batch, computed once per (place, team)."""
+    core = PipeData["core"]
+    distance = core.BattleEnv["shot_distance"]
+    all_enm = core.status["pop"].get("all", 0)
+    all_eng = core.status["energy"].get("all", 0)
+
+    side = {}
+    side_enm, side_eng, enmK, engK = [], [], [], []
+    for place, team in zip(PipeData["place"], PipeData["team"]):
+        key = (place, team)
+        if key not in side:
+            enm = enemies_within(core, place, team, distance)
+            eng = enemies_within(core, place, team, distance, "energy")
+            side[key] = (enm, eng, enm / all_enm if all_enm > 0 else 0, eng / all_eng if all_eng > 0 else 0)
+        enm, eng, enm_k, eng_k = side[key]
+        side_enm.append(enm); side_eng.append(eng); enmK.append(enm_k); engK.append(eng_k)
+
+    PipeData["side_enm"] = side_enm
+    PipeData["side_eng"] = side_eng
+    PipeData["all_enm"] = all_enm
+    PipeData["enmK"] = enmK
+    PipeData["engK"] = engK
+    return PipeData
+
+
 def build_population_status(PipeData, args):
     """
     Builds population statistics required by the Noah Kernel.
 
     Returns:
-        dict: {"pop": {place: {team: [ids], "sum": [ids]}, "all": total}}
+        dict: {"pop": {place: {team: {id: None}, "sum": {id: None}}, "all": total}}
+              (dicts are used as ordered sets of player IDs)
     """
     core = args
     pop_status = {}
 
     for pl in core.PlDict.values():
         if pl.place not in pop_status:
-            pop_status[pl.place] = {pl.team: [pl.id], "sum": [pl.id]}
+            pop_status[pl.place] = {pl.team: {pl.id: None}, "sum": {pl.id: None}}
         elif pl.team not in pop_status[pl.place]:
-            pop_status[pl.place][pl.team] = [pl.id]
-            pop_status[pl.place]["sum"].append(pl.id)
+            pop_status[pl.place][pl.team] = {pl.id: None}
+            pop_status[pl.place]["sum"][pl.id] = None
         else:
-            pop_status[pl.place][pl.team].append(pl.id)
-            pop_status[pl.place]["sum"].append(pl.id)
+            pop_status[pl.place][pl.team][pl.id] = None
+            pop_status[pl.place]["sum"][pl.id] = None
 
     pop_status["all"] = len(core.PlDict)
     PipeData["pop"] = pop_status
 
+    # The same buckets as lists sorted by ID, for O(1) random draws (see _random_enemy).
+    # apply_population_delta keeps them sorted, so a draw doesn't depend on whether
+    # the status was patched or rebuilt.
+    pool = {}
+    for place, place_stats in pop_status.items():
+        if place != "all":
+            pool[place] = {key: list(ids) for key, ids in place_stats.items()}
+    PipeData["pool"] = pool
+    PipeData["moves"] = {}
+
     return PipeData
 
 
@@ -1798,11 +2074,319 @@ def build_energy_status(PipeData, args):
     return PipeData
 
 
-if not noah.os.path.exists("./logs"):
-    noah.os.mkdir("logs")
+def apply_population_delta(PipeData, args):
+    """Moves the changed players between the "pop" buckets, or takes them out of the game."""
+    core = args
+    pop_status = core.status["pop"]
+    pool = core.status["pool"]
+
+    for pl, old, removed in PipeData["deltas"]:
+        if not removed and "place" not in old and "team" not in old:
+            continue
+        old_place = old.get("place", pl.place)
+        old_team = old.get("team", pl.team)
+        if not removed and old_place == pl.place and old_team == pl.team:
+            continue
+
+        # Leave the old bucket, dropping buckets that become empty (like a rebuild would).
+        place_stats = pop_status[old_place]
+        del place_stats[old_team][pl.id]
+        del place_stats["sum"][pl.id]
+        if not place_stats[old_team]:
+            del place_stats[old_team]
+        if not place_stats["sum"]:
+            del pop_status[old_place]
+        _pool_remove(pool, old_place, old_team, pl.id)
+
+        if removed:
+            pop_status["all"] -= 1
+            continue
+
+        if pl.place not in pop_status:
+            pop_status[pl.place] = {"sum": {}}
+        place_stats = pop_status[pl.place]
+        if pl.team not in place_stats:
+            place_stats[pl.team] = {}
+        place_stats[pl.team][pl.id] = None
+        place_stats["sum"][pl.id] = None
+        _pool_add(pool, pl.place, pl.team, pl.id)
+
+    core.status["moves"] = {}
+    return PipeData
+
+
+def note_move(core, pl, old_place=None, old_team=None):
+    """
+    Records in status["moves"] that `pl` changed level or team since the status was built,
+    so code that runs before the next update_status can see where players stand now
+    (see level_buckets). Called next to post_delta by everything that moves players.
+    """
+    moves = core.status.get("moves")
+    if moves is None:
+        return
+    if pl.id not in moves:
+        # Where the status still has the player.
+        moves[pl.id] = (pl.place if old_place is None else old_place,
+                        pl.team if old_team is None else old_team)
+    core.RoundCache.pop("moved_levels", None)
+
+
+def _moved_levels(core):
+    """
+    The players of status["moves"] who stand elsewhere now, built once per round (and again
+    after each new move).
+
+    Returns:
+        tuple: ({(place, team): {id, ...}} left since the status was built,
+                {place: {team: [id, ...]}} joined since)
+    """
+    cached = core.RoundCache.get("moved_levels")
+    if cached is None:
+        moved_out = {}
+        moved_in = {}
+        for pl_id, (place, team) in core.status["moves"].items():
+            pl = core.PlDict[pl_id]
+            if pl.place == place and pl.team == team:
+                continue
+            if (place, team) not in moved_out:
+                moved_out[(place, team)] = set()
+            moved_out[(place, team)].add(pl_id)
+            if pl.place not in moved_in:
+                moved_in[pl.place] = {}
+            if pl.team not in moved_in[pl.place]:
+                moved_in[pl.place][pl.team] = []
+            moved_in[pl.place][pl.team].append(pl_id)
+        cached = core.RoundCache["moved_levels"] = (moved_out, moved_in)
+    return cached
+
+
+def level_buckets(core, place, moved_out, moved_in):
+    """
+    Yields (team, ids) for the players standing on `place` now: the round-start buckets
+    of status["pop"] without the players who left, then the players who joined.
+    Untouched buckets are handed out as they are.
+    """
+    for team, ids in core.status["pop"].get(place, {}).items():
+        if team == "sum":
+            continue
+        left = moved_out.get((place, team))
+        if left:
+            ids = [pl_id for pl_id in ids if pl_id not in left]
+        yield team, ids
+    for team, ids in moved_in.get(place, {}).items():
+        yield team, ids
+
+
+def _pool_add(pool, place, team, pl_id):
+    """Puts a player into the pool lists, keeping them sorted by ID like a rebuild."""
+    if place not in pool:
+        pool[place] = {"sum": []}
+    place_pool = pool[place]
+    if team not in place_pool:
+        place_pool[team] = []
+    insort(place_pool["sum"], pl_id)
+    insort(place_pool[team], pl_id)
+
+
+def _pool_remove(pool, place, team, pl_id):
+    """Takes a player out of the pool lists, found by bisection."""
+    place_pool = pool[place]
+    for key in ("sum", team):
+        ids = place_pool[key]
+        del ids[bisect_left(ids, pl_id)]
+        if not ids:
+            del place_pool[key]
+    if not place_pool:
+        del pool[place]
+
+
+def apply_energy_delta(PipeData, args):
+    """Moves the changed players' energy between the "energy" buckets."""
+    core = args
+    energy_status = core.status["energy"]
+    pop_status = core.status["pop"]  # Already updated by apply_population_delta.
+
+    left = set()
+
+    for pl, old, removed in PipeData["deltas"]:
+        if not removed and "energy" not in old and "place" not in old and "team" not in old:
+            continue
+        old_place = old.get("place", pl.place)
+        old_team = old.get("team", pl.team)
+        old_energy = old.get("energy", pl.energy)
+
+        # Take the old contribution out...
+        place_stats = energy_status[old_place]
+        place_stats[old_team] -= old_energy
+        place_stats["sum"] -= old_energy
+        energy_status["all"] -= old_energy
+        left.add((old_place, old_team))
+
+        # ...and put the new one in.
+        if not removed:
+            energy = pl.energy
+            if pl.place not in energy_status:
+                energy_status[pl.place] = {"sum": 0}
+            place_stats = energy_status[pl.place]
+            place_stats[pl.team] = place_stats.get(pl.team, 0) + energy
+            place_stats["sum"] += energy
+            energy_status["all"] += energy
+
+    # Drop the buckets nobody stands in any more, once every player has moved.
+    for place, team in left:
+        if place not in pop_status:
+            energy_status.pop(place, None)
+        elif team not in pop_status[place]:
+            energy_status[place].pop(team, None)
+
+    return PipeData
+
+
+def apply_snapshot_delta(PipeData, args):
+    """Updates (or drops) the changed players' entries in the "snap" status."""
+    core = args
+    snap_status = core.status["snap"]
+
+    for pl, old, removed in PipeData["deltas"]:
+        if removed:
+            del snap_status[pl.id]
+        else:
+            snap_status[pl.id] = [pl.HP, pl.energy, pl.place, pl.team]
+
+    return PipeData
+
+
+def build_level_index(PipeData, args):
+    """
+    Builds the per-round level index: cumulative population and energy over the map levels,
+    so the enemies (or enemy energy) within a distance are a range query (see enemies_within).
+    The per-team columns and the "threat" column are only filled in when first asked for.
+
+    Returns:
+        dict: {"levels": {"lo": lowest_place, "hi": highest_place,
+                          "pop": [cumulative...], "energy": [cumulative...],
+                          "threat": [cumulative...] or None, "teams": {team: {column: [cumulative...]}}}}
+    """
+    pop_status = PipeData["pop"]
+    energy_status = PipeData["energy"]
+
+    places = [place for place in pop_status if place != "all"]
+    lo = min(places, default=0)
+    hi = max(places, default=0)
+
+    pop_sums = [0]
+    energy_sums = [0]
+    for place in range(lo, hi + 1):
+        if place in pop_status:
+            pop_sums.append(pop_sums[-1] + len(pop_status[place]["sum"]))
+            energy_sums.append(energy_sums[-1] + energy_status[place]["sum"])
+        else:
+            pop_sums.append(pop_sums[-1])
+            energy_sums.append(energy_sums[-1])
+
+    PipeData["levels"] = {"lo": lo, "hi": hi, "pop": pop_sums, "energy": energy_sums, "threat": None, "teams": {}}
+    return PipeData
+
+
+def threat_of(energy):
+    """How dangerous an enemy with this much energy is to stand next to (see predictive_defend_ai)."""
+    threat = 0
+    if energy >= wave_price(None): threat += 300
+    if energy >= 3: threat += energy * 20
+    return threat
+
+
+def _level_column(core, index, team, column):
+    """Returns the cumulative `column` of `team` (or of everyone if `team` is None), building it if needed."""
+    if team is None:
+        if column == "threat" and index["threat"] is None:
+            index["threat"] = _cumulate_levels(core, index, "sum", column)
+        return index[column]
+
+    team_columns = index["teams"].get(team)
+    if team_columns is None:
+        team_columns = index["teams"][team] = {}
+    if column not in team_columns:
+        team_columns[column] = _cumulate_levels(core, index, team, column)
+    return team_columns[column]
+
+
+def _cumulate_levels(core, index, key, column):
+    pop_status = core.status["pop"]
+    energy_status = core.status["energy"]
+    sums = [0]
+    for place in range(index["lo"], index["hi"] + 1):
+        value = 0
+        if place in pop_status and key in pop_status[place]:
+            if column == "pop":
+                value = len(pop_status[place][key])
+            elif column == "energy":
+                value = energy_status[place][key]
+            else:
+                # The threat follows the players' current energy, like the scan it replaces.
+                for pl_id in pop_status[place][key]:
+                    value += threat_of(core.PlDict[pl_id].energy)
+        sums.append(sums[-1] + value)
+    return sums
+
+
+def _random_enemy(core, pl, places):
+    """
+    Draws a random target for the AI of `pl` among the players standing on `places`,
+    uniformly over the valid ones: never `pl` itself, and a teammate only for a human.
+
+    Returns:
+        int: The target's ID, or None if there is no valid target.
+    """
+    pool = core.status["pool"]
+    buckets = [pool[place] for place in places if place in pool]
+    total = sum(len(place_pool["sum"]) for place_pool in buckets)
+    own = sum(len(place_pool.get(pl.team, ())) for place_pool in buckets)
+    if pl.real:
+        own = 1 if pl.id in core.status["snap"] and core.status["snap"][pl.id][2] in places else 0
+    if total - own <= 0:
+        return None
+
+    if (total - own) * 2 >= total:
+        # Mostly enemies: draw among everyone until the draw is valid (at most 2 tries on average).
+        ends = list(noah.accumulate(len(place_pool["sum"]) for place_pool in buckets))
+        while True:
+            r = core.rng.randrange(total)
+            b = noah.bisect(ends, r)
+            target = buckets[b]["sum"][r - (ends[b - 1] if b else 0)]
+            if target != pl.id and (pl.real or core.status["snap"][target][3] != pl.team):
+                return target
+
+    # Mostly teammates (so not a human): draw straight from the other teams' lists.
+    r = core.rng.randrange(total - own)
+    for place_pool in buckets:
+        for key, ids in place_pool.items():
+            if key == "sum" or key == pl.team:
+                continue
+            if r < len(ids):
+                return ids[r]
+            r -= len(ids)
+    return None
+
+
+def enemies_within(core, place, team, distance, column="pop"):
+    """
+    Sums `column` ("pop", "energy" or "threat") over the players of other teams
+    standing within `distance` levels of `place`, in O(1).
+    """
+    index = core.status["levels"]
+    lo = max(place - distance, index["lo"]) - index["lo"]
+    hi = min(place + distance, index["hi"]) - index["lo"] + 1
+    if hi <= lo:
+        return 0
+
+    total = _level_column(core, index, None, column)
+    mine = _level_column(core, index, team, column)
+    return (total[hi] - total[lo]) - (mine[hi] - mine[lo])
 
 
-CmdTable = noah.default_cmd_table
+# A copy, so that importing Ark does not modify the kernel's default table.
+CmdTable = {cmd: list(steps) for cmd, steps in noah.default_cmd_table.items()}
 CmdTable["-tweak_hp"] = [execute_hp_tweak]
 CmdTable["-tweak_energy"] = [execute_energy_tweak]
 CmdTable["-tweak_place"] = [execute_place_tweak]
@@ -1814,15 +2398,81 @@ CmdTable["-update_status"] += [
     build_snapshot_status,
 ]
 
+CmdTable["-status_delta"] += [
+    apply_population_delta,  # Must run first: the others look at the updated population.
+    apply_energy_delta,
+    apply_snapshot_delta,
+]
+
+CmdTable["-derive_status"] += [
+    build_level_index,
+]
+
 CmdTable["-build_able_context"] += [
     build_able_enmK,
     build_able_engK,
 ]
 
+CmdTable["-build_able_batch"] += [
+    build_batch_columns,
+    build_batch_enmK_engK,
+]
+
+
+def able_context_key(PipeData):
+    """The able context only depends on the player's place and team (and on the status)."""
+    pl = PipeData["self"]
+    return (pl.place, pl.team)
+
+
+# Kernel commands whose results Core.Exec may share until the next update_status.
+CmdMemo = {
+    "-build_able_context": able_context_key,
+}
+
+
+
+def judge_game_over(core):
+    """
+    Decides whether the battle is over. Used by Gaming() and by headless simulations.
+    It only reads the live team and human/AI counters of the core, so it costs the same
+    for any number of players and can run before update_status.
+
+    Returns:
+        None: If the battle goes on.
+        tuple: (winner_team, winner_id). winner_id is set when a single player wins,
+               and (None, None) means that nobody survived.
+    """
+    teams = [team for team in core.TeamTotals if team != "all"]
+
+    if len(teams) > 1:
+        return None
+
+    if teams and teams[0] != 0:
+        alive = core.TeamTotals["all"][0]
+        if alive > 1:
+            return (teams[0], None)
+        elif alive == 1:
+            return (teams[0], next(iter(core.PlDict)))
+
+    elif teams and teams[0] == 0:
+        humans_num = core.ControlTotals["human"]
+        ai_num = core.ControlTotals["ai"]
+        if ai_num == 0 and humans_num == 1:
+            return (0, next(iter(core.PlDict)))
+        elif ai_num != 0:
+            return (0, None)
+    else:
+        return (None, None)
+
+    return None
 
 
 def Gaming():
     """This is the main game loop function."""
+    if not noah.os.path.exists("./logs"):
+        noah.os.mkdir("logs")
+
     timest = noah.time.strftime("%Y-%m-%d_%H-%M-%S")
     core = noah.Core(InitBattleEnv, BaseActDict, noah.IO(ArkUI.exp, logpath=f"./logs/noah_{timest}.gz"))
 
@@ -1830,6 +2480,7 @@ def Gaming():
 
     # Add CmdTable to the core
     core.CmdTable = CmdTable
+    core.CmdMemo = CmdMemo
 
     core.mk_pldict()
     core.ls_acts()
@@ -1865,48 +2516,48 @@ def Gaming():
 
         core.DealAct()
         core.rm_deaths()
-        core.update_status()
 
-        teams = []
-        for place in core.status["pop"].keys():
-            if place != "all":
-                teams += list(core.status["pop"][place].keys())
-        while "sum" in teams:
-            teams.remove("sum")
-        teams = set(teams)
-
-        if len(teams) <= 1:
+        outcome = judge_game_over(core)
+        if outcome is None:
+            core.update_status()
+        else:
             core.ui.typing_delay *= 7
-            if teams and 0 not in teams:
-                if core.status["pop"]["all"] > 1:
-                    core.ui.out("/ark/game-over-by-team", imp=[list(core.PlDict.values())[0].team])
-                    break
-                elif core.status["pop"]["all"] == 1:
-                    core.ui.out("/ark/game-over", imp=[list(core.PlDict.values())[0].id])
-                    break
-
-            elif teams and 0 in teams:
-                humans_num = 0
-                ai_num = 0
-                for pl in core.PlDict.values():
-                    if pl.real:
-                        humans_num += 1
-                    else:
-                        ai_num += 1
-                if ai_num == 0 and humans_num == 1:
-                    core.ui.out("/ark/game-over", imp=[list(core.PlDict.values())[0].id])
-                    break
-                elif ai_num != 0:
-                    core.ui.out("/ark/game-over-by-team", imp=[0])
-                    break
+            winner_team, winner_id = outcome
+            if winner_id is not None:
+                core.ui.out("/ark/game-over", imp=[winner_id])
+            elif winner_team is not None:
+                core.ui.out("/ark/game-over-by-team", imp=[winner_team])
             else:
                 core.ui.out("/ark/game-over-nobody")
-                break
-            core.ui.typing_delay /= 7
+            break
 
         core.ui.out("/share/endl")
+        core.ui.flush()  # One frame per round (see noah.Renderer).
+
+    core.ui.flush()
+    core.dump_profile()
+    core.ui.close_log()
+
+
+def Simulate(seed=None, BattleEnv=None, lang="en_us", **kwargs):
+    """
+    Plays one AI-only battle of Energy Battle without a terminal.
+
+    Args:
+        seed: Seed of the battle. None picks a fresh one.
+        BattleEnv (dict): Battle parameters. Defaults to InitBattleEnv (with "real" forced to 0).
+        lang (str): Language of the texts written to the log and to `HPlog`.
+        **kwargs: Passed through to noah.Simulation (e.g. logpath, max_rounds).
 
-    core.ui.write_log()
+    Returns:
+        noah.SimResult: The outcome of the battle.
+    """
+    env = BattleEnv if BattleEnv is not None else InitBattleEnv
+    sim = noah.Simulation(
+        env, BaseActDict, CmdTable, seed=seed,
+        exp=Expression[lang], judge=judge_game_over, events=env.get("tweaks", []), CmdMemo=CmdMemo, **kwargs
+    )
+    return sim.run()
 
 
 def _exit():
@@ -1915,16 +2566,38 @@ def _exit():
     ArkUI.out("./exit")
     return True
 
-# Transition Table: Maps user input from the main menu to corresponding functions.
-TransTable = {
-    "mode": {
-        "1": [ArkUI.get('./opt/1'), Gaming],
-        "2": [ArkUI.get('./opt/2'), Setting],
-        "3": [ArkUI.get('./opt/3'), _exit],
-    }
-}
 
-if __name__ == "__main__":
+def main():
+    """The interactive entry point: terminal check, language selection and the main menu."""
+    global ArkUI
+
+    # Terminal check
+    try:
+        from terminal_check import show_check_result
+        if not show_check_result():
+            return
+    except ImportError:
+        pass  # Skip if module not found
+
+    # You can select a language here
+    chosen_lang_code = select_language(Expression)
+    noah.time.sleep(0.3)
+    noah.clear_screen()
+
+    chosen_lang = Expression[chosen_lang_code]
+    ArkUI = noah.IO(chosen_lang, delay=float(chosen_lang['/core/typing-delay'])*0.01)
+
+    ArkUI.workdir = "/ark/"
+    ArkUI.out("./welcome", color="YELLOW")
+
+    # Transition Table: Maps user input from the main menu to corresponding functions.
+    TransTable = {
+        "mode": {
+            "1": [ArkUI.get('./opt/1'), Gaming],
+            "2": [ArkUI.get('./opt/2'), Setting],
+            "3": [ArkUI.get('./opt/3'), _exit],
+        }
+    }
 
     exit_game = False
 
@@ -1951,3 +2624,6 @@ if __name__ == "__main__":
         if exit_game:
             break
 
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Benchmark Suite for the Noah Kernel
+
+Times each phase of a round (SelectAct, DealAct, rm_deaths, update_status, clean_round)
+over a sweep of battle sizes and settings, using headless AI-only battles.
+Every configuration runs in a fresh process, so its peak RSS is its own.
+
+Usage:
+    python bench.py --out new.json
+    python bench.py --num 100 1000 --ai-quality 0 --rounds 3 --out quick.json
+    python bench.py --compare old.json new.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import subprocess
+import time
+
+try:
+    import resource  # Not available on Windows.
+except ImportError:
+    resource = None
+
+PHASES = ["clean_round", "SelectAct", "DealAct", "rm_deaths", "update_status"]
+
+DEFAULT_SWEEP = {
+    "num": [100, 1000, 10000, 100000, 1000000],
+    "ai_quality": [0, 1],
+    "map": [1, 5],
+    "team_size": [1, 10],
+    "player_store": ["object"],
+}
+
+
+def peak_rss_kb():
+    """Returns the peak resident set size of this process in KiB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB.
+    return peak // 1024 if platform.system() == "Darwin" else peak
+
+
+def bench_config(config: dict, rounds: int, seed: int, profile: bool = False) -> dict:
+    """
+    Plays up to `rounds` rounds of one configuration and times every phase separately.
+
+    Returns:
+        dict: The configuration, per-phase timings, rounds/sec and peak RSS
+              (and the kernel profile if `profile` is set).
+    """
+    import ark
+    import noah
+
+    prof = noah.enable_profiler() if profile else None
+
+    env = dict(ark.InitBattleEnv)
+    env.update(config)
+    env["tweaks"] = []
+
+    start = time.perf_counter()
+    sim = noah.Simulation(env, ark.BaseActDict, ark.CmdTable, seed=seed, judge=ark.judge_game_over, CmdMemo=ark.CmdMemo)
+    core = sim.setup()
+    setup_time = time.perf_counter() - start
+
+    timings = {phase: [] for phase in PHASES}
+    alive_start = len(core.PlDict)
+    played = 0
+    decided = False
+
+    def timed(phase, func):
+        t = time.perf_counter()
+        func()
+        timings[phase].append(time.perf_counter() - t)
+
+    while played < rounds and not decided:
+        core.ui.write_log()
+        timed("clean_round", core.clean_round)
+        core.rounds += 1
+        timed("SelectAct", core.SelectAct)
+        timed("DealAct", core.DealAct)
+        timed("rm_deaths", core.rm_deaths)
+        timed("update_status", core.update_status)
+        played += 1
+        decided = sim.judge(core) is not None
+
+    round_time = sum(sum(t) for t in timings.values())
+    result = {
+        "config": config,
+        "seed": seed,
+        "rounds": played,
+        "decided": decided,
+        "alive_start": alive_start,
+        "alive_end": len(core.PlDict),
+        "setup_time": setup_time,
+        "rounds_per_sec": played / round_time if round_time > 0 else 0,
+        "phases": {
+            phase: {
+                "total": sum(t),
+                "mean": sum(t) / len(t) if t else 0,
+                "max": max(t) if t else 0,
+            } for phase, t in timings.items()
+        },
+        "peak_rss_kb": peak_rss_kb(),
+    }
+    if prof is not None:
+        result["profile"] = prof.as_dict()
+    return result
+
+
+def _child(queue, config, rounds, seed, profile):
+    queue.put(bench_config(config, rounds, seed, profile))
+
+
+def run_isolated(config: dict, rounds: int, seed: int, timeout: float, profile: bool = False) -> dict:
+    """Runs bench_config() in a fresh process, giving up after `timeout` seconds."""
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_child, args=(queue, config, rounds, seed, profile))
+    proc.start()
+    try:
+        return queue.get(timeout=timeout)
+    except Exception:
+        return {"config": config, "seed": seed, "error": f"timeout after {timeout}s or crashed"}
+    finally:
+        if proc.is_alive():
+            proc.terminate()
+        proc.join()
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def run_suite(sweep: dict, rounds: int, seed: int, timeout: float, profile: bool = False) -> dict:
+    results = []
+    keys = list(sweep.keys())
+    for values in itertools.product(*[sweep[k] for k in keys]):
+        config = dict(zip(keys, values))
+        config["real"] = 0
+        res = run_isolated(config, rounds, seed, timeout, profile)
+        results.append(res)
+        print(format_result(res), flush=True)
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "rounds": rounds,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def config_label(config: dict) -> str:
+    # The default Player-object store is left out, so older result files still match.
+    return " ".join(f"{k}={config[k]}" for k in DEFAULT_SWEEP
+                    if k in config and not (k == "player_store" and config[k] == "object"))
+
+
+def format_result(res: dict) -> str:
+    label = config_label(res["config"])
+    if "error" in res:
+        return f"{label:<60} {res['error']}"
+    phases = "  ".join(f"{p} {res['phases'][p]['mean']*1000:9.2f}ms" for p in PHASES)
+    rss = f"{res['peak_rss_kb'] / 1024:8.1f}MB" if res["peak_rss_kb"] is not None else "       ?"
+    return f"{label:<60} {res['rounds_per_sec']:9.2f} r/s  {rss}  {phases}"
+
+
+def compare(old_path: str, new_path: str):
+    """Prints the per-phase speedup of `new` over `old` for every configuration they share."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    old_by_label = {config_label(r["config"]): r for r in old["results"]}
+    print(f"old: {old['meta'].get('revision')}  new: {new['meta'].get('revision')}  (speedup = old / new)")
+    for res in new["results"]:
+        label = config_label(res["config"])
+        base = old_by_label.get(label)
+        if base is None or "error" in res or "error" in base:
+            continue
+        cells = []
+        for phase in PHASES:
+            old_t, new_t = base["phases"][phase]["mean"], res["phases"][phase]["mean"]
+            cells.append(f"{phase} {old_t / new_t:6.2f}x" if new_t > 0 else f"{phase}     -")
+        if base["rounds_per_sec"] > 0:
+            cells.append(f"rounds/sec {res['rounds_per_sec'] / base['rounds_per_sec']:6.2f}x")
+        print(f"{label:<60} " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time every phase of a Noah round over a sweep of battle sizes.")
+    parser.add_argument("--num", type=int, nargs="+", default=DEFAULT_SWEEP["num"])
+    parser.add_argument("--ai-quality", type=int, nargs="+", default=DEFAULT_SWEEP["ai_quality"])
+    parser.add_argument("--map", type=int, nargs="+", default=DEFAULT_SWEEP["map"])
+    parser.add_argument("--team-size", type=int, nargs="+", default=DEFAULT_SWEEP["team_size"])
+    parser.add_argument("--player-store", nargs="+", default=DEFAULT_SWEEP["player_store"],
+                        choices=["object", "array"], help="PlDict implementation (see noah.PlayerStore)")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds per configuration")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=600, help="seconds before a configuration is abandoned")
+    parser.add_argument("--profile", action="store_true",
+                        help="also record the kernel profile (per-step and per-pipeline times); adds overhead")
+    parser.add_argument("--out", default=None, metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", nargs=2, default=None, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        sweep = {
+            "num": args.num,
+            "ai_quality": args.ai_quality,
+            "map": args.map,
+            "team_size": args.team_size,
+            "player_store": args.player_store,
+        }
+        suite = run_suite(sweep, args.rounds, args.seed, args.timeout, args.profile)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(suite, f, indent=2)
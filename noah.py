@@ -6,10 +6,15 @@ Project initiated: 2025.8.2
 Last updated: 2025.10.19
 """
 
-import random, re, os, time, sys, gzip
+import random, re, os, time, sys, gzip, math, threading, queue, atexit, functools
+from array import array
+from bisect import bisect
+from itertools import accumulate
 
 # A common trick to enable ANSI escape code support on Windows terminals.
-os.system("")
+# Other platforms support ANSI out of the box, so we don't spawn a shell there.
+if os.name == 'nt':
+    os.system("")
 
 def clear_screen():
     """
@@ -20,6 +25,7 @@ def clear_screen():
     'nt' corresponds to Windows systems.
     'posix' corresponds to Linux, macOS, and other Unix-like systems.
     """
+    default_screen.flush()
     # For Windows
     if os.name == 'nt':
         _ = os.system('cls')
@@ -46,10 +52,211 @@ C = {
     "WHITE": '\033[1;37m',
 }
 
+# Levels of log records. IO.log_level drops the records below it.
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+
+class LogSink():
+    """
+    A gzip log file that stays open for a whole battle.
+
+    Records are handed over through a bounded queue and compressed by a background thread,
+    so compression stays off the round's critical path. When the queue is full, `write`
+    blocks until the thread catches up. The file is written as a single gzip member.
+    """
+
+    def __init__(self, path, compresslevel=6, maxsize=64):
+        """
+        Args:
+            path (str): The gzip file to append to.
+            compresslevel (int): zlib level, 1 (fastest) to 9 (smallest).
+            maxsize (int): How many records may wait for the thread before `write` blocks.
+        """
+        self.path = path
+        # Opened here, so that a bad path fails in the caller rather than in the thread.
+        self.file = gzip.open(path, "ab", compresslevel=compresslevel)
+        self.queue = queue.Queue(maxsize)
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="noah-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def write(self, data: bytes):
+        """Queues `data` to be compressed into the file."""
+        if self.closed:
+            raise ValueError(f"write to a closed log: {self.path}")
+        self.queue.put(data)
+
+    def flush(self):
+        """Blocks until every queued record is compressed and flushed to the file."""
+        self.queue.join()
+
+    def close(self):
+        """
+        Writes out the queued records and closes the file. Safe to call twice.
+        Raises the error that stopped the background thread, if any.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+        atexit.unregister(self.close)
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        while True:
+            data = self.queue.get()
+            try:
+                if data is None:
+                    self.file.close()
+                    return
+                if self.error is None:
+                    self.file.write(data)
+                    if self.queue.empty():
+                        self.file.flush()
+            except Exception as e:
+                # Keep draining the queue, or the game thread would block on it forever.
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+
+class Renderer():
+    """
+    Terminal output in frames. Text is gathered in one buffer and written in large chunks
+    (when input is requested, at `flush`, or once the buffer is full) instead of one
+    write per `print`.
+
+    The typewriter effect is emulated with one chunk of characters per frame, on a schedule
+    of `delay` seconds per character. If the terminal cannot keep up and the output falls
+    more than `LAG` seconds behind schedule, the rest is written at once, and the effect is
+    left out for the next `LAG_PAUSE` seconds.
+    """
+
+    FRAME = 1 / 60      # Seconds between two typewriter chunks (and progress updates, see due).
+    LAG = 0.25
+    LAG_PAUSE = 1.0
+
+    def __init__(self, stream=None, max_buffer=65536):
+        """
+        Args:
+            stream: The file to write to. None means `sys.stdout`, looked up at every write,
+                    so that it can be redirected.
+            max_buffer (int): The buffered size (in characters) that triggers a flush.
+        """
+        self.stream = stream
+        self.max_buffer = max_buffer
+        self.buffer = []
+        self.size = 0
+        self.last_flush = time.perf_counter()
+        self.lagging_until = 0
+
+    def _stream(self):
+        return self.stream if self.stream is not None else sys.stdout
+
+    def write(self, text: str):
+        """Buffers `text`."""
+        self.buffer.append(text)
+        self.size += len(text)
+        if self.size >= self.max_buffer:
+            self.flush()
+
+    def flush(self):
+        """Writes out the buffer in one go."""
+        if self.buffer:
+            stream = self._stream()
+            stream.write("".join(self.buffer))
+            stream.flush()
+            self.buffer = []
+            self.size = 0
+        self.last_flush = time.perf_counter()
+
+    def due(self) -> bool:
+        """True if a frame has passed since the last flush. Throttles frequently updated lines."""
+        return time.perf_counter() - self.last_flush >= self.FRAME
+
+    def type(self, text: str, delay: float, end: str = ""):
+        """
+        Writes `text` with a typewriter effect of `delay` seconds per character (ANSI codes are free),
+        then `end` at once. With a delay, the line is on the terminal when this returns,
+        even while the effect is paused, since it is meant to be read right away.
+        """
+        now = time.perf_counter()
+        if delay <= 0:
+            self.write(text + end)
+            return
+        if now < self.lagging_until:
+            self.write(text + end)
+            self.flush()
+            return
+
+        self.flush()
+        stream = self._stream()
+        chunks = typewriter_chunks(text, max(1, round(self.FRAME / delay)))
+        start = now
+        typed = 0
+        for i, (chunk, visible) in enumerate(chunks):
+            stream.write(chunk)
+            stream.flush()
+            typed += visible
+            due = start + typed * delay
+            now = time.perf_counter()
+            if now - due > self.LAG:
+                # Output falls behind: drop the effect.
+                stream.write("".join(rest for rest, _ in chunks[i + 1:]))
+                stream.flush()
+                self.lagging_until = now + self.LAG_PAUSE
+                break
+            if due > now:
+                time.sleep(due - now)
+        if end:
+            stream.write(end)
+            stream.flush()
+        self.last_flush = time.perf_counter()
+
+
+def typewriter_chunks(text: str, per_chunk: int) -> list:
+    """
+    Cuts `text` into chunks of `per_chunk` visible characters, keeping ANSI escape codes whole.
+
+    Returns:
+        list: [(chunk, number_of_visible_characters), ...]
+    """
+    chunks = []
+    cur = []
+    count = 0
+    i = 0
+    while i < len(text):
+        match = _ANSI.match(text, i)
+        if match:
+            cur.append(match.group())
+            i = match.end()
+            continue
+        cur.append(text[i])
+        i += 1
+        count += 1
+        if count == per_chunk:
+            chunks.append(("".join(cur), count))
+            cur = []
+            count = 0
+    if cur:
+        chunks.append(("".join(cur), count))
+    return chunks
+
+
+# The screen shared by every IO, so that their outputs stay in order.
+default_screen = Renderer()
+atexit.register(default_screen.flush)
+
+
 class IO():
     """Defines an IO class for managing input, output, and logging."""
 
-    def __init__(self, exp={}, logpath="noah-log.gz", delay=0.01):
+    def __init__(self, exp={}, logpath="noah-log.gz", delay=0.01, headless=False, compresslevel=6, log_level="debug",
+                 screen=None):
         """
         Initializes the IO manager.
 
@@ -57,19 +264,59 @@ class IO():
             exp (dict): A dictionary of expression templates.
                         Format: {key1: [line1, line2, ...], ...}
                         where lineX is a string template to be processed by explain().
-            logpath (str): The path for storing log files.
+            logpath (str): The path for storing log files. None disables the log file.
+            headless (bool): If True, nothing is printed or kept in history and
+                             `inp` never blocks on stdin (used by `Simulation`).
+            compresslevel (int): zlib level of the log file (see LogSink).
+            log_level (str): The lowest level (see LOG_LEVELS) written to the log file.
+                             Text sent to the log channel by `out` is "info" unless
+                             told otherwise (Core.RaiseError logs at "error").
+            screen (Renderer): Where console output goes. Defaults to the shared `default_screen`.
         """
         self.exp = exp
         self.workdir = "/"  # The current working directory for relative paths in `exp`.
+        self.paths = {}     # Cache of dealpath: {(workdir, path): full_path}
         self.history = []   # A history of all inputs and outputs.
         self.logs = []      # A list of messages to be written to a log file.
         self.logpath = logpath
+        self.compresslevel = compresslevel
+        self.sink = None    # The LogSink of `logpath`, opened by the first write_log.
+        self.log_level = log_level
 
         self.colors = C
         self.indent = 0     # Tracks the current indentation level for formatted output.
         self.typing_delay = delay  # Delay for the typewriter effect. Set to 0 to disable.
+        self.screen = screen if screen is not None else default_screen
+        self.headless = headless   # No terminal attached: drop console/history output, never read stdin.
+        if headless:
+            self.typing_delay = 0
+
+    def silent(self):
+        """True if nothing passed to `out` can ever be seen (headless, without an "info" log)."""
+        return self.headless and not self.log_enabled()
 
-    def out(self, key, mode="sh", real_end="\n", dr=False, imp=[], indent=True, color=None):
+    def log_enabled(self, level="info"):
+        """True if records of this level reach the log file."""
+        return bool(self.logpath) and LOG_LEVELS[level] >= LOG_LEVELS[self.log_level]
+
+    def log(self, record, level="info"):
+        """
+        Writes a record to the log channel only, as is (no template substitution).
+
+        Args:
+            record (str or func): The text, or a function returning it. A function is
+                                  only called if the level is logged, so costly records
+                                  are never built for nothing.
+            level (str): The level of the record (see LOG_LEVELS).
+        """
+        if not self.log_enabled(level):
+            return
+        if callable(record):
+            record = record()
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.logs.append(f"{timestamp}\n{record}\n")
+
+    def out(self, key, mode="sh", real_end="\n", dr=False, imp=[], indent=True, color=None, level="info"):
         """
         Outputs content to specified channels after evaluating it.
 
@@ -86,12 +333,21 @@ class IO():
             indent (bool or int): If True, uses the current `self.indent`. If an int, uses that as the indentation level.
                                  If False, no indentation is applied.
             color (str): The key for a color from `self.colors` to apply to the output.
+            level (str): The level of the log record (see LOG_LEVELS).
         """
         if isinstance(key, list):
             # If `key` is a list, output each item in it recursively.
             for k in key:
-                self.out(k, mode, real_end, dr, imp, indent, color)
+                self.out(k, mode, real_end, dr, imp, indent, color, level)
         else:
+            if "l" in mode and not self.log_enabled(level):
+                mode = mode.replace("l", "")
+            if self.headless:
+                # Only the log channel survives without a terminal.
+                mode = "l" if "l" in mode else ""
+                if not mode:
+                    return
+
             # Determine indentation prefix.
             if indent is True:
                 plus = (self.indent * 4) * " "
@@ -118,13 +374,11 @@ class IO():
 
                 # Output to the specified channels.
                 if "s" in mode:
-                    if plus:
-                        print(plus, end="")
                     if self.typing_delay > 0:
-                        self._typewriter_print(colored_res)
-                        print(end=real_end)
+                        self.screen.write(plus)
+                        self.screen.type(colored_res, self.typing_delay, end=real_end)
                     else:
-                        print(colored_res, end=real_end)
+                        self.screen.write(plus + colored_res + real_end)
 
                 if "h" in mode:
                     self.history.append(full_format_res)
@@ -134,14 +388,25 @@ class IO():
 
 
     def write_log(self):
-        with gzip.open(self.logpath, 'ab') as f:
-            # need to encode the string
-            f.write(("\n".join(self.logs) + '\n').encode('utf-8'))
+        if not self.logpath:
+            self.logs.clear()
+            return
+
+        if self.sink is None:
+            self.sink = LogSink(self.logpath, self.compresslevel)
+        self.sink.write(("\n".join(self.logs) + '\n').encode('utf-8'))
 
         self.logs.clear()
 
+    def close_log(self):
+        """Writes out the pending log records and closes the log file."""
+        self.write_log()
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
 
-    def inp(self, key, mode="sh", dr=False, imp=[], indent=True, color=None):
+    def inp(self, key, mode="sh", dr=False, imp=[], indent=True, color=None, level="info"):
         """
         Prompts the user for input after printing a message, and returns the result.
         The user's response is appended to the message in the history/log.
@@ -152,20 +417,35 @@ class IO():
         Returns:
             str: The user's input.
         """
-        self.out(key, mode, real_end="", dr=dr, imp=imp, indent=indent, color=color)
-        res = input()
+        self.out(key, mode, real_end="", dr=dr, imp=imp, indent=indent, color=color, level=level)
+        if self.headless:
+            # Nobody to ask: behave as if Enter was pressed.
+            res = ""
+        else:
+            self.screen.flush()
+            res = input()
         if "h" in mode and self.history:
             self.history[-1] += res
-        if "l" in mode and self.logs:
+        if "l" in mode and self.log_enabled(level) and self.logs:
             self.logs[-1] += res
 
         return res
 
+    def flush(self):
+        """Writes out the buffered console output (see Renderer)."""
+        if not self.headless:
+            self.screen.flush()
+
     def dealpath(self, path):
         """
         Resolves a relative path for the expression table into an absolute path
         based on the current working directory (`self.workdir`).
+        Results are cached per working directory.
         """
+        full_path = self.paths.get((self.workdir, path))
+        if full_path is not None:
+            return full_path
+
         if path.startswith('.'):
             # It's a relative path.
             full_path = self.workdir + path[1:]
@@ -176,6 +456,7 @@ class IO():
         if "//" in full_path:
             full_path = full_path.replace("//", "/")
 
+        self.paths[(self.workdir, path)] = full_path
         return full_path
 
     def get(self, key):
@@ -186,31 +467,49 @@ class IO():
             return "<haven't translated>"
 
 
-    def _typewriter_print(self, text: str):
-        """Prints text character by character with a typewriter effect,
-        skipping ANSI escape codes."""
-        ansi_pattern = re.compile(r'\033\[[0-9;]*m')
+# A "$" followed by digits, e.g. "$0" or "$12".
+_PLACEHOLDER = re.compile(r'\$(\d+)')
+# An ANSI color escape code, e.g. "\033[1;36m".
+_ANSI = re.compile(r'\033\[[0-9;]*m')
 
-        i = 0
-        while i < len(text):
-            match = ansi_pattern.match(text, i)
-            if match:
-                sys.stdout.write(match.group())
-                sys.stdout.flush()
-                i = match.end()
-            else:
-                sys.stdout.write(text[i])
-                sys.stdout.flush()
-                time.sleep(self.typing_delay)
-                i += 1
+
+# Message templates are a few hundred short strings per language, so each is split only once.
+@functools.lru_cache(maxsize=4096)
+def compile_template(template_str: str) -> tuple:
+    """
+    Splits a template into literal text and placeholders (the result is cached).
+    e.g. "Player $0 has $1 HP." -> ("Player ", (0, "$0"), " has ", (1, "$1"), " HP.")
+    """
+    parts = _PLACEHOLDER.split(template_str)
+    # Odd items are the digits of the placeholders: keep the index and the original text.
+    return tuple(
+        (int(part), "$" + part) if i % 2 else part
+        for i, part in enumerate(parts) if i % 2 or part
+    )
+
+
+def render_template(parts: tuple, values: list) -> str:
+    """Joins a compiled template (see compile_template) with the values of its placeholders."""
+    out = []
+    for part in parts:
+        if part.__class__ is str:
+            out.append(part)
+        else:
+            index, raw = part
+            # Out of range placeholders are kept as they are.
+            out.append(str(values[index]) if index < len(values) else raw)
+    return "".join(out)
 
 
 def explain(template_str: str, values: list) -> str:
     """
     A simple yet effective template engine that replaces placeholders like $0, $1, etc.,
-    with values from a list. It uses re.sub for a safe, single-pass replacement.
+    with values from a list.
     This approach is chosen over f-strings for its ability to handle dynamic, runtime substitutions.
 
+    Templates are compiled once (see compile_template) and then only joined with the values.
+    Long, one-off texts are split without being kept in the cache.
+
     Args:
         template_str (str): The string containing placeholders (e.g., "Player $0 has $1 HP.").
         values (list): A list of values to substitute into the template.
@@ -218,29 +517,13 @@ def explain(template_str: str, values: list) -> str:
     Returns:
         str: The formatted string.
     """
-    def replacer(match):
-        """
-        This inner function is the brain of the replacement logic, called by re.sub for each match.
-        """
-        # match.group(1) captures the digits inside the parentheses of the regex.
-        # e.g., for a match on "$12", match.group(1) will be "12".
-        try:
-            index = int(match.group(1))
-            # Robustness check: return the value if the index is valid.
-            if 0 <= index < len(values):
-                return str(values[index])
-            else:
-                # If the index is out of bounds, return the original placeholder to avoid errors.
-                return match.group(0)  # match.group(0) is the full matched string, e.g., "$12".
-        except (ValueError, IndexError):
-            # In case of any conversion error, also return the original placeholder.
-            return match.group(0)
-
-    # The regex r'\$(\d+)' finds a literal '$' followed by one or more digits.
-    # The parentheses (\d+) create a capture group for the digits.
-    return re.sub(r'\$(\d+)', replacer, template_str)
+    if "$" not in template_str:
+        return template_str
+    if len(template_str) > 4096:
+        return render_template(compile_template.__wrapped__(template_str), values)
+    return render_template(compile_template(template_str), values)
 
-def decide(able_actions: list, weights: list, real: bool):
+def decide(able_actions: list, weights: list, real: bool, rng=random):
     """
     Performs a weighted random selection from a list of actions.
     For a real player, it suggests the action with the highest weight.
@@ -249,6 +532,7 @@ def decide(able_actions: list, weights: list, real: bool):
         able_actions (list): A list of available actions, e.g., ['attack', 'defend'].
         weights (list): A list of corresponding numerical weights, e.g., [10, 80].
         real (bool): If True, indicates a human player. If False, an AI.
+        rng (random.Random): The random number generator to draw from, usually `core.rng`.
 
     Returns:
         str: The chosen action.
@@ -260,9 +544,9 @@ def decide(able_actions: list, weights: list, real: bool):
 
     if not real:
         # AI player: make a weighted random choice.
-        # random.choices returns a list, so we take the first element.
+        # rng.choices returns a list, so we take the first element.
         try:
-            chosen_action = random.choices(population=able_actions, weights=weights, k=1)[0]
+            chosen_action = rng.choices(population=able_actions, weights=weights, k=1)[0]
         except ValueError:
             # This can happen if weights are invalid (e.g., all zero).
             return False
@@ -272,6 +556,51 @@ def decide(able_actions: list, weights: list, real: bool):
 
     return chosen_action
 
+def decide_batch(able_rows: list, weight_rows: list, rng=random):
+    """
+    The batched counterpart of `decide` for AI players: draws every choice in one pass.
+
+    Each row is sampled like `random.choices` does it (cumulative weights and one uniform
+    draw scaled by the total), but the uniform draws are taken for all rows up front.
+
+    Args:
+        able_rows (list): One list of available actions per player.
+        weight_rows (list): The matching lists of weights.
+        rng (random.Random): The random number generator to draw from, usually `core.rng`.
+
+    Returns:
+        tuple: (choices, invalid)
+               - choices: per row, the chosen action, None if the row is empty,
+                 or False if its weights are invalid (e.g. all zero).
+               - invalid: the indexes of the rows with invalid weights.
+    """
+    draws = [rng.random() for _ in range(len(able_rows))]
+    choices = []
+    invalid = []
+
+    for i, (able_actions, weights, u) in enumerate(zip(able_rows, weight_rows, draws)):
+        if not able_actions:
+            choices.append(None)
+            continue
+        if len(able_actions) == 1:
+            total = weights[0]
+            if not (total > 0.0 and math.isfinite(total)):
+                choices.append(False)
+                invalid.append(i)
+            else:
+                choices.append(able_actions[0])
+            continue
+
+        cum_weights = list(accumulate(weights))
+        total = cum_weights[-1]
+        if not (total > 0.0 and math.isfinite(total)):
+            choices.append(False)
+            invalid.append(i)
+            continue
+        choices.append(able_actions[bisect(cum_weights, u * total, 0, len(cum_weights) - 1)])
+
+    return choices, invalid
+
 def table(data, exp, spl="\n"):
     """
     Generates a formatted string table from data using an expression template.
@@ -308,8 +637,8 @@ class Player():
         # 0 is reserved for human players or AI allied with humans.
         self.team = 0
 
-        # A list of selected actions and their parameters for the current turn. Cleared each turn.
-        # Format: [[action_key<str>, action_sign_index<int>], ...]
+        # The actions selected for the current turn. Cleared each turn.
+        # Format: [action_id<int>, ...] (indexes into Core.ActTable)
         self.acts = []
 
     def select(self, core, decision=None):
@@ -387,6 +716,7 @@ class Player():
             act_key (str): The key of the action that caused the damage.
             core (Core): The main game core instance.
         """
+        old_HP = self.HP
         if decreasion >= self.HP:
             # Prevents HP from going negative and logs exact lethal damage.
             decreasion = self.HP
@@ -395,6 +725,7 @@ class Player():
             self.HP -= decreasion
 
         if decreasion != 0:
+            core.post_delta(self, HP=old_HP)
             core.PlDict[origin].outd += decreasion
             self.HPlog.append([decreasion, origin, core.ui.get(f'/act/{act_key}/name')])
 
@@ -436,6 +767,185 @@ class Player():
         return able, ai_weights
 
 
+def _column(name):
+    """A Player attribute stored in the PlayerStore column `name`."""
+    def fget(self):
+        return getattr(self._store, name)[self.id]
+    def fset(self, value):
+        getattr(self._store, name)[self.id] = value
+    return property(fget, fset)
+
+def _flag_column(name):
+    """Like _column, for boolean attributes stored in a bytearray."""
+    def fget(self):
+        return bool(getattr(self._store, name)[self.id])
+    def fset(self, value):
+        getattr(self._store, name)[self.id] = 1 if value else 0
+    return property(fget, fset)
+
+def _sparse_column(name, factory):
+    """A Player container attribute, kept in a dict on the store and only created on first use."""
+    def fget(self):
+        table = getattr(self._store, name)
+        value = table.get(self.id)
+        if value is None:
+            value = table[self.id] = factory()
+        return value
+    def fset(self, value):
+        getattr(self._store, name)[self.id] = value
+    return property(fget, fset)
+
+
+class PlayerView():
+    """
+    A lightweight, Player-compatible handle on one player of a PlayerStore.
+    Views are created on access and hold no state of their own, so existing
+    ActDict functions work unchanged on array-backed battles.
+    It shares Player's methods rather than subclassing it, so that views have no `__dict__`.
+    """
+    __slots__ = ("_store", "id")
+
+    select = Player.select
+    hurted = Player.hurted
+    build_able = Player.build_able
+
+    HP = _column("HP")
+    energy = _column("energy")
+    place = _column("place")
+    team = _column("team")
+    ai_quality = _column("ai_quality")
+    outd = _column("outd")
+    real = _flag_column("real")
+
+    unable = _sparse_column("unable", list)
+    HPlog = _sparse_column("HPlog", list)
+    kills = _sparse_column("kills", list)
+    acts = _sparse_column("acts", list)
+    status = _sparse_column("status", dict)
+
+    def __init__(self, store, id):
+        self._store = store
+        self.id = id
+
+    def __eq__(self, other):
+        return isinstance(other, PlayerView) and other._store is self._store and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"PlayerView({self.id})"
+
+
+class PlayerStore():
+    """
+    A structure-of-arrays alternative to the PlDict of Player objects, for very large battles.
+
+    HP, energy, place, team, ai_quality, real and outd live in contiguous arrays indexed
+    by player ID; the per-player lists and dicts (unable, HPlog, kills, acts, status) are only
+    allocated for players that use them. It behaves like the `{player_id: Player}` dict
+    (get, `in`, `del`, len, keys/values/items), handing out PlayerView objects.
+
+    Enable it with BattleEnv["player_store"] = "array".
+    """
+
+    def __init__(self, size: int):
+        self.size = size  # The highest player ID this store can hold.
+        n = size + 1      # Index 0 is unused, player IDs start at 1.
+
+        self.HP = array('q', bytes(8 * n))
+        self.energy = array('q', bytes(8 * n))
+        self.outd = array('q', bytes(8 * n))
+        self.place = array('i', bytes(4 * n))
+        self.team = array('i', bytes(4 * n))
+        self.ai_quality = array('i', bytes(4 * n))
+        self.real = bytearray(n)
+        self.alive = bytearray(n)  # 1 while the player is in the game.
+        self.count = 0
+
+        # Sparse containers: {player_id: list/dict}
+        self.unable = {}
+        self.HPlog = {}
+        self.kills = {}
+        self.acts = {}
+        self.status = {}
+
+    def spawn(self, id) -> PlayerView:
+        """Adds a player with the same defaults as `Player(id)` and returns its view."""
+        self.HP[id] = 1
+        self.energy[id] = 0
+        self.outd[id] = 0
+        self.place[id] = 0
+        self.team[id] = 0
+        self.ai_quality[id] = 0
+        self.real[id] = 1
+        if not self.alive[id]:
+            self.alive[id] = 1
+            self.count += 1
+        return PlayerView(self, id)
+
+    def reset_round(self):
+        """Clears the per-turn containers (acts and status) of every player at once."""
+        self.acts.clear()
+        self.status.clear()
+
+    def __setitem__(self, id, pl):
+        if isinstance(pl, PlayerView) and pl._store is self:
+            if pl.id != id:
+                raise KeyError(f"PlayerView {pl.id} can't be stored as player {id}")
+        else:
+            # Copy a Player object into the columns.
+            self.HP[id] = pl.HP
+            self.energy[id] = pl.energy
+            self.outd[id] = pl.outd
+            self.place[id] = pl.place
+            self.team[id] = pl.team
+            self.ai_quality[id] = pl.ai_quality
+            self.real[id] = 1 if pl.real else 0
+            for name in ("unable", "HPlog", "kills", "acts", "status"):
+                value = getattr(pl, name)
+                if value:
+                    getattr(self, name)[id] = value
+
+        if not self.alive[id]:
+            self.alive[id] = 1
+            self.count += 1
+
+    def __getitem__(self, id) -> PlayerView:
+        if isinstance(id, int) and 0 < id <= self.size and self.alive[id]:
+            return PlayerView(self, id)
+        raise KeyError(id)
+
+    def __delitem__(self, id):
+        if not (isinstance(id, int) and 0 < id <= self.size and self.alive[id]):
+            raise KeyError(id)
+        # The columns keep the data of eliminated players, like a deleted Player object would.
+        self.alive[id] = 0
+        self.count -= 1
+
+    def __contains__(self, id):
+        return isinstance(id, int) and 0 < id <= self.size and self.alive[id] == 1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        alive = self.alive
+        return (id for id in range(1, self.size + 1) if alive[id])
+
+    def get(self, id, default=None):
+        return self[id] if id in self else default
+
+    def keys(self):
+        return list(iter(self))
+
+    def values(self):
+        return (PlayerView(self, id) for id in self)
+
+    def items(self):
+        return ((id, PlayerView(self, id)) for id in self)
+
+
 class Act():
     """
     'Action': A core concept in the Noah kernel.
@@ -443,6 +953,7 @@ class Act():
     """
     def __init__(self, ownerID, key, channel='default'):
         self.acted = False      # Has this action been processed/dealt?
+        self.aid = None         # Its index in Core.ActTable, set when it is registered.
         self.ownerID = ownerID  # The ID of the player who initiated this action.
         self.key = key          # The key of this action in ActDict.
         self.channel = channel  # The pipe processing channel this action uses.
@@ -460,7 +971,8 @@ class Act():
             core.channels[self.channel] = PipeWorkFlow(
                 PipeData=core.channels.get(self.channel, None),
                 steps=core.ActDict[self.key]["d_exec"],
-                args=(self, core)
+                args=(self, core),
+                name=f"act/{self.key}"
             )
             self.acted = True
 
@@ -471,35 +983,164 @@ class Act():
         """
         if not self.payed:
             cost = core.ActDict[self.key]["price"](self)
-            core.PlDict[self.ownerID].energy -= cost
+            owner = core.PlDict[self.ownerID]
+            old_energy = owner.energy
+            owner.energy -= cost
+            if cost:
+                core.post_delta(owner, energy=old_energy)
             self.payed = True
             if core.PlDict[self.ownerID].energy < 0:
                 core.RaiseError("Act.pay", f"Player {self.ownerID} can't afford act {self.key}")
 
+def build_able_batch(players: list, core) -> list:
+    """
+    The batched counterpart of `Player.build_able`, for many AI players of the same `ai_quality`.
+
+    The columns every action may need are built once for the whole batch by "-build_able_batch".
+    Each action's optional "able_batch" and "ai_batch" (a list parallel to "ai") entries then
+    take the batch and return one value per player. Actions without them fall back to the
+    per-player functions, with a context built by "-build_able_context" only when needed.
+
+    Returns:
+        list: One (able_actions, ai_weights) pair per player, as Player.build_able returns them.
+    """
+    n = len(players)
+    rows = [([], []) for _ in range(n)]
+    if not n:
+        return rows
+
+    batch = {"players": players, "core": core}
+    if core.CmdTable.get("-build_able_batch"):
+        batch = core.Exec("-build_able_batch", "build_able_batch", batch)
+
+    contexts = [None] * n
+    def context_of(i):
+        if contexts[i] is None:
+            contexts[i] = core.Exec("-build_able_context", "build_able_batch", {"self": players[i], "core": core})
+        return contexts[i]
+
+    ai_quality = players[0].ai_quality
+    for key, act in core.ActDict.items():
+        if key == 'cp' or act["human_only"]: continue  # Skip special keys and human-only actions.
+
+        able_batch = act.get("able_batch")
+        able_column = able_batch(batch) if able_batch else None
+
+        index = min(len(act["ai"])-1, ai_quality)
+        ai_batch = act.get("ai_batch", [])
+        ai_func = ai_batch[index] if index < len(ai_batch) else None
+        weight_column = ai_func(batch) if ai_func else None
+
+        for i, pl in enumerate(players):
+            if key in pl.unable:
+                continue
+            if not (able_column[i] if able_column is not None else act["able"](context_of(i))):
+                continue
+
+            able, ai_weights = rows[i]
+            able.append(key)
+            value = weight_column[i] if weight_column is not None else act["ai"][index](context_of(i))
+            ai_weights.append(value * act["weight"])
+
+    return rows
+
 def SelectAct_WorkerFunc(task):
     """
     A worker function designed for use with `map`. It handles the full action
     selection process for a single player.
+    The task is [player, core], optionally followed by the decision already
+    drawn by decide_batch (None, False or the action key).
     """
-    player, core = task
+    player, core = task[0], task[1]
     result_acts = []
 
-    able_actions, ai_weights = player.build_able(core)
-    if not able_actions:
-        # This player has no available actions.
-        return [[], [player.id]] # Returns empty acts, and player ID for potential "no action" log.
+    if len(task) > 2:
+        decision_key = task[2]
+    else:
+        able_actions, ai_weights = player.build_able(core)
+        if not able_actions:
+            # This player has no available actions.
+            return [[], [player.id]] # Returns empty acts, and player ID for potential "no action" log.
+
+        decision_key = decide(able_actions, ai_weights, player.real, core.rng)
+        if decision_key is False:
+            core.ui.out(f"[SelectAct_WorkerFunc] Invalid weights for actions. Actions: {able_actions}, Weights: {ai_weights}", mode="l", dr=True)
 
-    decision_key = decide(able_actions, ai_weights, player.real)
     if decision_key is None:
         return [[], [player.id]]
-    elif decision_key is False:
-        core.ui.out(f"[SelectAct_WorkerFunc] Invalid weights for actions. Actions: {able_actions}, Weights: {ai_weights}", mode="l", dr=True)
-    else:
+    elif decision_key is not False:
         result_acts.extend(player.select(core, decision_key))
 
     return [result_acts, []]
 
-def PipeWorkFlow(PipeData, steps: list, args: tuple):
+class Profiler():
+    """
+    An opt-in profiler for the kernel's hot paths.
+    It keeps call counts, cumulative and maximum wall time for every PipeWorkFlow step
+    function and for every named pipeline (kernel commands and action pipelines).
+
+    Times are inclusive: a step that runs another pipeline (e.g. an AI weight function
+    calling `core.Exec`) also counts the time spent in that pipeline.
+    """
+
+    def __init__(self):
+        # Format: {name: [calls, total_seconds, max_seconds], ...}
+        self.steps = {}
+        self.pipes = {}
+
+    def record(self, table: dict, name: str, elapsed: float):
+        entry = table.get(name)
+        if entry is None:
+            table[name] = [1, elapsed, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+
+    def reset(self):
+        self.steps.clear()
+        self.pipes.clear()
+
+    def as_dict(self) -> dict:
+        """Returns the collected data in a JSON-friendly form."""
+        def convert(table):
+            return {name: {"calls": c, "total": t, "max": m} for name, (c, t, m) in table.items()}
+        return {"steps": convert(self.steps), "pipes": convert(self.pipes)}
+
+    def report(self, title="Kernel Profile") -> str:
+        """Formats the collected data as a table, most expensive entries first."""
+        msg = []
+        msg.append(f"{'='*60}")
+        msg.append(title)
+        msg.append(f"{'='*60}")
+        for caption, table in (("Pipelines", self.pipes), ("Steps", self.steps)):
+            msg.append(f"{caption}:")
+            msg.append(f"  {'name':<32} {'calls':>10} {'total(s)':>10} {'mean(us)':>10} {'max(us)':>10}")
+            for name, (calls, total, max_t) in sorted(table.items(), key=lambda i: i[1][1], reverse=True):
+                msg.append(f"  {name:<32} {calls:>10} {total:>10.4f} {total / calls * 1e6:>10.1f} {max_t * 1e6:>10.1f}")
+        msg.append(f"{'='*60}")
+        return "\n".join(msg)
+
+
+# The active Profiler, or None when profiling is disabled (the default).
+profiler = None
+
+def enable_profiler() -> Profiler:
+    """Turns kernel profiling on and returns the Profiler collecting the data."""
+    global profiler
+    if profiler is None:
+        profiler = Profiler()
+    return profiler
+
+def disable_profiler():
+    """Turns kernel profiling off. Returns the Profiler that was active, if any."""
+    global profiler
+    old, profiler = profiler, None
+    return old
+
+
+def PipeWorkFlow(PipeData, steps: list, args: tuple, name=None):
     """
     Implements a stream processing pipeline architecture.
     It takes an input stream, passes it sequentially through a list of functions (`steps`),
@@ -509,15 +1150,34 @@ def PipeWorkFlow(PipeData, steps: list, args: tuple):
         PipeData: The initial data/object to be processed.
         steps (list of functions): The functions that make up the processing pipeline.
         args (tuple): Common arguments that are passed to every function in `steps`.
+        name (str): Optional name of the pipeline, used by the profiler.
 
     Returns:
         The final result after the last processing step.
     """
+    if profiler is not None:
+        return _profiled_pipe(PipeData, steps, args, name)
+
     OutData = PipeData
     for step_func in steps:
         OutData = step_func(OutData, args)
     return OutData
 
+def _profiled_pipe(PipeData, steps: list, args: tuple, name):
+    """PipeWorkFlow with timing of every step. Only used while a Profiler is enabled."""
+    prof = profiler
+    clock = time.perf_counter
+    pipe_start = clock()
+
+    OutData = PipeData
+    for step_func in steps:
+        start = clock()
+        OutData = step_func(OutData, args)
+        prof.record(prof.steps, getattr(step_func, "__name__", repr(step_func)), clock() - start)
+
+    if name is not None:
+        prof.record(prof.pipes, name, clock() - pipe_start)
+    return OutData
 
 
 
@@ -530,6 +1190,25 @@ default_cmd_table = {
     "-build_able_context": [
 
     ],
+
+    # Keeps `Core.status` up to date between two full rebuilds.
+    # Steps receive {"deltas": [[Player, {attribute: previous_value}, removed<bool>], ...]}
+    # with one entry per player changed since the last update_status.
+    "-status_delta": [
+
+    ],
+
+    # Columns shared by the "able_batch"/"ai_batch" functions of the ActDict.
+    # Steps receive {"players": [Player, ...], "core": Core} and add one list per column.
+    "-build_able_batch": [
+
+    ],
+
+    # Derived indexes over `Core.status`, recomputed after every change of the status.
+    # Steps receive the status itself and may add keys to it.
+    "-derive_status": [
+
+    ],
 }
 
 
@@ -541,17 +1220,37 @@ class Core():
     between functions by holding them as attributes, making the code cleaner and more modular.
     """
 
-    def __init__(self, BattleEnv: dict, ActDict: dict, ui: IO):
+    def __init__(self, BattleEnv: dict, ActDict: dict, ui: IO, seed=None):
         # A dictionary containing battle setup parameters (e.g., number of players, initial HP).
         self.BattleEnv = BattleEnv
 
-        # A dictionary that registers actions for the current turn, grouped by priority.
-        # This structure allows for easy, priority-based processing.
-        # Format: {priority1: {ActName1: [Act1, ...], ...}, ...}
-        self.ActSign = {}
+        # The random number generator of this game. Every random decision of the kernel
+        # and of the game should draw from it, so that a battle can be replayed from its seed
+        # and several games can share one process without affecting each other.
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = random.Random(self.seed)
+
+        # The actions registered for the current turn, in registration order.
+        # An action's id (`Act.aid`) is its index in this list.
+        # Format: [Act0, Act1, ...]
+        self.ActTable = []
+
+        # The same actions grouped by key.
+        # Format: {ActName: [Act, ...], ...}
+        self.ActByKey = {}
+
+        # A scratch space for values the game derives once per round (e.g. AI rankings)
+        # and shares between players. Emptied by clean_round and update_status.
+        self.RoundCache = {}
+
+        # Who targets whom: the ids of the actions of `owner_id` aimed at `target_id`.
+        # Area actions (`Act.target is True`) are filed under (owner_id, None).
+        # Format: {(owner_id, target_id or None): [action_id, ...], ...}
+        self.ActPairs = {}
 
         # The central dictionary of all players in the game.
         # Format: {player_id: Player_instance, ...}
+        # (or a PlayerStore with the same interface, see mk_pldict)
         self.PlDict = {}
 
         # The dictionary defining all possible actions in the game.
@@ -569,6 +1268,13 @@ class Core():
         #   "d_exec": (list) A list of deal-phase execution functions, added to the PipeWorkFlow.
         self.ActDict = ActDict
 
+        # The action keys in resolution order: highest priority first, and
+        # in ActDict order among actions of the same priority.
+        self.ActOrder = sorted(
+            (key for key, act in ActDict.items() if isinstance(act, dict) and "priority" in act),
+            key=lambda key: -ActDict[key]["priority"]
+        )
+
         # The current round number.
         self.rounds = 0
 
@@ -577,30 +1283,60 @@ class Core():
         #
         # Build-In Format (you can change it by modifying Core.status_components):
         # "pop": {
-        #     place: {team: [player_ids], "sum": [all_ids_at_place]},
+        #     place: {team: {player_id: None, ...}, "sum": {player_id: None, ...}},
         #     "all": total_population
         # },
+        # (the ID collections are dicts used as ordered sets, so that one player
+        #  can be added or removed in O(1) when the status is updated incrementally)
         # "energy": {
         #     place: {team: total_energy, "sum": total_energy_at_place},
         #     "all": total_energy_in_game
         # }
         self.status = {}
 
+        # True while `status` is kept up to date by "-status_delta" (see post_delta),
+        # so update_status doesn't have to rebuild it from scratch every round.
+        self.status_live = False
+
+        # Changes waiting for the next update_status, one entry per player.
+        # Format: {player_id: [Player, {attribute: value_at_last_update}, removed<bool>], ...}
+        self.StatusDeltas = {}
+
+        # Live population and energy of every team, kept up to date by post_delta
+        # (unlike `status`, which only changes at update_status).
+        # Format: {team_id: [population, energy], ..., "all": [population, energy]}
+        self.TeamTotals = {"all": [0, 0]}
+        # Live number of human and AI players, kept up to date the same way.
+        self.ControlTotals = {"human": 0, "ai": 0}
+
         # A temporary dictionary to hold stream data for each channel during the dealing phase.
         self.channels = {}
 
         self.deaths = [] # List of player IDs who died this turn.
+        # IDs of the players whose HP dropped to 0 or below (reported through post_delta),
+        # so DealAct only checks them instead of every player.
+        self.Dying = set()
         self.ui = ui
         self.exit_game = False # A flag to signal the end of the game loop.
 
         # A table that contain the names and PipeWorkFlows of kernel commands
         self.CmdTable = default_cmd_table
+        # Optional {cmd_name: key(PipeData)} of commands whose results Exec may reuse,
+        # and the results themselves ({cmd_name: {key: result}}), dropped by update_status.
+        self.CmdMemo = {}
+        self.ExecMemo = {}
 
         # A table that contain the Event objects
         self.EventBus = []
 
         self.debug = True  # The debug mode of the Core
 
+        # The "debug" log of the game state (see log_snapshot): written every `snapshot_every`
+        # rounds, and if `snapshot_changed` is set, only with the players changed since the last one.
+        self.snapshot_every = 1
+        self.snapshot_changed = False
+        self.SnapDirty = None # IDs changed since the last snapshot (None until the first one).
+
     def mk_pldict(self):
         """Creates the `self.PlDict` (player dictionary) based on `self.BattleEnv` settings."""
         if self.BattleEnv["team_size"] < 1:
@@ -609,8 +1345,15 @@ class Core():
         team_count = 0
         cur_team = 1 if not self.BattleEnv["assist_team"] else 0
 
+        # BattleEnv["player_store"] = "array" keeps players in a PlayerStore instead of Player objects.
+        if self.BattleEnv.get("player_store") == "array":
+            self.PlDict = PlayerStore(self.BattleEnv["num"])
+            new_player = self.PlDict.spawn
+        else:
+            new_player = Player
+
         for i in range(self.BattleEnv["num"]):
-            pl = Player(i + 1)
+            pl = new_player(i + 1)
             pl.HP = self.BattleEnv["initHP"]
             pl.ai_quality = self.BattleEnv["ai_quality"]
 
@@ -628,6 +1371,8 @@ class Core():
                 pl.ai_quality = 9999
 
             self.PlDict[i + 1] = pl
+            if pl.HP <= 0:
+                self.Dying.add(pl.id)
 
 
     def update_status(self):
@@ -638,8 +1383,125 @@ class Core():
         - Noah to provide essential status paths
         - Games to add custom status paths (e.g., snapshot)
         - Easy extension without modifying core Noah code
+
+        If the game registers "-status_delta" steps, the status is only built from scratch
+        the first time (or after invalidate_status). From then on, only the players reported
+        through post_delta are applied to it, so the cost follows the number of changes
+        rather than the number of players.
         """
+        self.RoundCache = {}
+        self.ExecMemo = {}
+        if self.status_live:
+            # When most players changed, a rebuild is cheaper than patching them one by one.
+            if len(self.StatusDeltas) * 2 <= len(self.PlDict):
+                if self.StatusDeltas:
+                    deltas = list(self.StatusDeltas.values())
+                    self.StatusDeltas = {}
+                    self.Exec("-status_delta", "Core.update_status", {"deltas": deltas})
+                    self.derive_status()
+                return
+
+        self.StatusDeltas = {}
+        self.build_team_totals()
         self.status = self.Exec("-update_status", "Core.update_status", {})
+        self.status_live = bool(self.CmdTable.get("-status_delta"))
+        self.derive_status()
+
+    def derive_status(self):
+        """Recomputes the indexes derived from `self.status` (see "-derive_status")."""
+        if self.CmdTable.get("-derive_status"):
+            self.Exec("-derive_status", "Core.derive_status", self.status)
+
+    def invalidate_status(self):
+        """Forces the next update_status to rebuild the status from scratch.
+        Call it after changing players without post_delta."""
+        self.status_live = False
+        self.StatusDeltas = {}
+
+    def build_team_totals(self):
+        """Recounts `TeamTotals` and `ControlTotals` from the players."""
+        totals = {"all": [0, 0]}
+        humans = 0
+        for pl in self.PlDict.values():
+            if pl.real:
+                humans += 1
+            if pl.team not in totals:
+                totals[pl.team] = [1, pl.energy]
+            else:
+                team_totals = totals[pl.team]
+                team_totals[0] += 1
+                team_totals[1] += pl.energy
+        everyone = totals["all"]
+        for team, (population, energy) in totals.items():
+            if team != "all":
+                everyone[0] += population
+                everyone[1] += energy
+        self.TeamTotals = totals
+        self.ControlTotals = {"human": humans, "ai": everyone[0] - humans}
+
+    def team_totals(self, team):
+        """
+        Returns:
+            tuple: (population, energy) of `team` and (population, energy) of everyone else.
+        """
+        mine = self.TeamTotals.get(team, (0, 0))
+        everyone = self.TeamTotals["all"]
+        return mine[0], mine[1], everyone[0] - mine[0], everyone[1] - mine[1]
+
+    def post_delta(self, pl, removed=False, **old):
+        """
+        Reports a change of a player to the incremental status and the team totals.
+
+        Args:
+            pl (Player): The player who changed (already holding the new values).
+            removed (bool): True if the player is leaving the game.
+            **old: The previous values of the changed attributes, e.g. energy=3.
+        """
+        if self.snapshot_changed and self.SnapDirty is not None:
+            self.SnapDirty.add(pl.id)
+
+        if "HP" in old:
+            if pl.HP <= 0:
+                self.Dying.add(pl.id)
+            else:
+                self.Dying.discard(pl.id)
+
+        if removed or "energy" in old or "team" in old:
+            totals = self.TeamTotals
+            everyone = totals["all"]
+            old_team = old.get("team", pl.team)
+            old_energy = old.get("energy", pl.energy)
+
+            team_totals = totals.get(old_team)
+            if team_totals is not None:
+                team_totals[0] -= 1
+                team_totals[1] -= old_energy
+                everyone[0] -= 1
+                everyone[1] -= old_energy
+                if team_totals[0] <= 0:
+                    del totals[old_team]
+
+            if removed:
+                self.ControlTotals["human" if pl.real else "ai"] -= 1
+            else:
+                if pl.team not in totals:
+                    totals[pl.team] = [0, 0]
+                team_totals = totals[pl.team]
+                team_totals[0] += 1
+                team_totals[1] += pl.energy
+                everyone[0] += 1
+                everyone[1] += pl.energy
+
+        if self.status_live:
+            pending = self.StatusDeltas.get(pl.id)
+            if pending is None:
+                self.StatusDeltas[pl.id] = [pl, old, removed]
+            else:
+                # Keep the value from the last update, it is what the status still holds.
+                for key, value in old.items():
+                    if key not in pending[1]:
+                        pending[1][key] = value
+                pending[2] = pending[2] or removed
 
 
     def SelectAct(self):
@@ -659,10 +1521,30 @@ class Core():
         if ai_players:
             # Show progress bar for a large number of AIs.
             show_progress = len(self.PlDict) >= 10000 or (self.BattleEnv["ai_quality"] > 0 and len(self.PlDict) >= 100)
+            show_progress = show_progress and not self.ui.headless
             if show_progress:
-                print(f"{self.ui.get('/core/ai-dealing')}  {0.000:3.0f}%", end='\r', flush=True)
-
-            tasks = [[pl, self] for pl in ai_players]
+                self.ui.screen.write(f"{self.ui.get('/core/ai-dealing')}  {0.000:3.0f}%\r")
+                self.ui.screen.flush()
+
+            # Evaluate the able masks and AI weights a whole ai_quality group at a time,
+            # then draw every decision at once. Both only read the game state.
+            groups = {}
+            for i, pl in enumerate(ai_players):
+                groups.setdefault(pl.ai_quality, []).append(i)
+            able_rows = [None] * len(ai_players)
+            weight_rows = [None] * len(ai_players)
+            for indexes in groups.values():
+                for i, (able, weights) in zip(indexes, build_able_batch([ai_players[i] for i in indexes], self)):
+                    able_rows[i] = able
+                    weight_rows[i] = weights
+
+            decisions, invalid = decide_batch(able_rows, weight_rows, self.rng)
+            if invalid:
+                self.ui.out("[SelectAct] Invalid weights for players: " +
+                            ", ".join(f"{ai_players[i].id} {dict(zip(able_rows[i], weight_rows[i]))}" for i in invalid),
+                            mode="l", dr=True)
+
+            tasks = [[pl, self, decision] for pl, decision in zip(ai_players, decisions)]
             results_iterator = map(SelectAct_WorkerFunc, tasks)
 
             completed_tasks = 0
@@ -671,13 +1553,17 @@ class Core():
             for res in results_iterator:
                 if show_progress:
                     completed_tasks += 1
-                    percentage = (completed_tasks / total_tasks) * 100
-                    status_line = f"{self.ui.get('/core/ai-dealing')}  {percentage:3.0f}%".ljust(40)
-                    print(status_line, end='\r', flush=True)
+                    # At most one update per frame reaches the terminal.
+                    if self.ui.screen.due():
+                        percentage = (completed_tasks / total_tasks) * 100
+                        status_line = f"{self.ui.get('/core/ai-dealing')}  {percentage:3.0f}%".ljust(40)
+                        self.ui.screen.write(status_line + "\r")
+                        self.ui.screen.flush()
                 all_results.append(res)
 
             if show_progress:
-                print(self.ui.get('/core/ai-completed').ljust(40), end='\n\n')
+                self.ui.screen.write(self.ui.get('/core/ai-completed').ljust(40) + "\n\n")
+                self.ui.screen.flush()
 
         # Process human players sequentially.
         for pl in human_players:
@@ -687,45 +1573,72 @@ class Core():
         for acts, dead_ids in all_results:
             self.deaths.extend(dead_ids)
             for new_act in acts:
-                priority = self.ActDict[new_act.key]["priority"]
-
-                # Ensure the priority and action key exist in the registry.
-                if priority not in self.ActSign:
-                    self.ActSign[priority] = {}
-                if new_act.key not in self.ActSign[priority]:
-                    self.ActSign[priority][new_act.key] = []
-
                 # Register the new action.
-                self.ActSign[priority][new_act.key].append(new_act)
-
-                # Record the action index on the player object for reference.
-                idx = len(self.ActSign[priority][new_act.key]) - 1
-                self.PlDict[new_act.ownerID].acts.append([new_act.key, idx])
+                new_act.aid = len(self.ActTable)
+                self.ActTable.append(new_act)
+                if new_act.key not in self.ActByKey:
+                    self.ActByKey[new_act.key] = [new_act]
+                else:
+                    self.ActByKey[new_act.key].append(new_act)
+
+                # Record the action id on its owner, and under its target if it has one.
+                self.PlDict[new_act.ownerID].acts.append(new_act.aid)
+                target = getattr(new_act, "target", None)
+                if type(target) is int:
+                    pair = (new_act.ownerID, target)
+                elif target is True:
+                    pair = (new_act.ownerID, None)
+                else:
+                    continue
+                if pair not in self.ActPairs:
+                    self.ActPairs[pair] = [new_act.aid]
+                else:
+                    self.ActPairs[pair].append(new_act.aid)
 
         if self.deaths:
             # Report players who were unable to select an action.
             player_ids_str = ", ".join([str(d) for d in self.deaths])
             self.ui.out("/core/no-available-act", imp=[player_ids_str], color="RED")
 
-    def DealAct(self):
-
-        self.ui.out(self.debug_snapshot(), mode="l", dr=True)
+    def acts_aimed(self, owner_id, target_id) -> list:
+        """
+        Returns the ids of the actions of `owner_id` that are aimed at `target_id`,
+        including its area actions, in registration order (see ActPairs).
+        """
+        aimed = self.ActPairs.get((owner_id, target_id))
+        area = self.ActPairs.get((owner_id, None))
+        if area is None:
+            return aimed or []
+        if aimed is None:
+            return area
+        return sorted(aimed + area)
 
+    def DealAct(self):
         """Processes all selected actions for the round, in descending order of priority."""
+        self.log_snapshot()
+
         self.org_delay = self.ui.typing_delay
         self.ui.typing_delay = 0 # Disable typing delay for faster processing.
 
-        # Get priorities and sort them from highest to lowest.
-        act_order = sorted(self.ActSign.keys(), reverse=True)
-        for priority in act_order:
-            for act_name in self.ActSign[priority]:
-                for act in self.ActSign[priority][act_name]:
-                    act.deal(self) # Queues the action into the pipe workflow.
-
-        # After all actions are dealt, check for deaths. This is a preliminary check.
-        for _pl in list(self.PlDict.keys()):
-            if self.PlDict[_pl].HP <= 0:
+        # Action keys from the highest priority to the lowest (see ActOrder).
+        for act_name in self.ActOrder:
+            acts = self.ActByKey.get(act_name)
+            if not acts:
+                continue
+            # An action may resolve all its acts of the round at once, see "d_batch".
+            d_batch = self.ActDict[act_name].get("d_batch")
+            if d_batch is not None:
+                d_batch(acts, self)
+                continue
+            for act in acts:
+                act.deal(self) # Queues the action into the pipe workflow.
+
+        # After all actions are dealt, check for deaths. This is a preliminary check,
+        # limited to the players whose HP reached 0 (see Dying).
+        for _pl in sorted(self.Dying):
+            if _pl in self.PlDict and self.PlDict[_pl].HP <= 0:
                 self.deaths.append(_pl)
+        self.Dying = set()
 
         self.ui.typing_delay = self.org_delay # Restore original typing delay.
 
@@ -734,18 +1647,15 @@ class Core():
         show = []
         teams_affected = {}
 
-        # Group deaths by team for team-based reporting.
-        unique_deaths = sorted(list(set(self.deaths)))
-        for _pl in unique_deaths:
-            if _pl in self.PlDict:
-                team_id = self.PlDict[_pl].team
-                if team_id not in teams_affected:
-                    teams_affected[team_id] = []
-                teams_affected[team_id].append(_pl)
-
-        for _pl in unique_deaths:
+        for _pl in sorted(set(self.deaths)):
             if _pl in self.PlDict:
                 player = self.PlDict[_pl]
+
+                # Group deaths by team for team-based reporting.
+                if player.team not in teams_affected:
+                    teams_affected[player.team] = []
+                teams_affected[player.team].append(_pl)
+
                 if player.real:
                     # Pause for human player's death message.
                     self.ui.typing_delay *= 5
@@ -762,6 +1672,7 @@ class Core():
                 except IndexError:
                     pass # No damage log available.
 
+                self.post_delta(player, removed=True)
                 del self.PlDict[_pl]
                 show.append(str(_pl))
 
@@ -780,10 +1691,16 @@ class Core():
 
     def clean_round(self):
         """Clears temporary round-specific data to prepare for the next round."""
-        self.ActSign = {}
-        for pl in self.PlDict.values():
-            pl.acts = []
-            pl.status = {}
+        self.ActTable = []
+        self.ActByKey = {}
+        self.ActPairs = {}
+        self.RoundCache = {}
+        if isinstance(self.PlDict, PlayerStore):
+            self.PlDict.reset_round()
+        else:
+            for pl in self.PlDict.values():
+                pl.acts = []
+                pl.status = {}
         self.deaths = []
         self.channels = {}
 
@@ -815,6 +1732,8 @@ class Core():
         """Resets all data for the current battle session to start fresh."""
         self.clean_round()
         self.PlDict = {}
+        self.Dying = set()
+        self.ui.close_log()
         # Assuming `exp` is available in the global scope to re-initialize IO.
         # This might need adjustment based on the main script's structure.
         self.ui = IO(exp=self.ui.exp)
@@ -824,20 +1743,40 @@ class Core():
         mode = "l"
         if self.debug:
             mode += "s"
-        self.ui.inp(f"[{domain}] ERROR: {msg}", mode=mode, dr=True, color="RED")
+        self.ui.inp(f"[{domain}] ERROR: {msg}", mode=mode, dr=True, color="RED", level="error")
         self.ui.write_log()
 
 
     def Exec(self, cmd_name: str, domain: str, PipeData=None):
+        """
+        Runs the PipeWorkFlow of a kernel command.
+
+        If the game gave the command a key function in `CmdMemo`, the result is memoized
+        until the next update_status: a call whose PipeData maps to a known key gets
+        the stored result, with its own PipeData entries (e.g. "self") laid over it.
+        """
         if cmd_name not in self.CmdTable:
             self.RaiseError(domain, f"Command not found: {cmd_name}")
             return PipeData
-        else:
-            try:
-                return PipeWorkFlow(PipeData, self.CmdTable[cmd_name], self)
-            except Exception as e:
-                self.RaiseError(domain, f"Kernel command '{cmd_name}' failed: {e}")
-                return {}
+
+        memo_key = self.CmdMemo.get(cmd_name)
+        if memo_key is not None:
+            key = memo_key(PipeData)
+            memo = self.ExecMemo.setdefault(cmd_name, {})
+            if key in memo:
+                result = dict(memo[key])
+                result.update(PipeData)
+                return result
+
+        try:
+            result = PipeWorkFlow(PipeData, self.CmdTable[cmd_name], self, cmd_name)
+        except Exception as e:
+            self.RaiseError(domain, f"Kernel command '{cmd_name}' failed: {e}")
+            return {}
+
+        if memo_key is not None:
+            memo[key] = dict(result)
+        return result
 
 
     def DealEvents(self):
@@ -857,27 +1796,57 @@ class Core():
         self.EventBus.clear()
 
 
-    def debug_snapshot(self, title="Game State"):
+    def log_snapshot(self):
+        """
+        Logs debug_snapshot() at the "debug" level, every `snapshot_every` rounds.
+        Nothing is built if the "debug" level is not logged.
+        """
+        if not self.ui.log_enabled("debug") or self.rounds % self.snapshot_every:
+            return
+
+        players = None
+        if self.snapshot_changed:
+            if self.SnapDirty is not None:
+                players = sorted(pid for pid in self.SnapDirty if pid in self.PlDict)
+            self.SnapDirty = set()
+        self.ui.log(lambda: self.debug_snapshot(players=players), level="debug")
+
+    def debug_snapshot(self, title="Game State", players=None):
+        """
+        Args:
+            title (str): The title line.
+            players (list): The IDs of the players to list. None lists everyone.
+        """
         msg = []
         msg.append(f"{'='*60}")
         msg.append(f"{title} - Round {self.rounds}")
         msg.append(f"{'='*60}")
 
         msg.append(f"Alive: {len(self.PlDict)} players")
-        for pid, pl in self.PlDict.items():
+        if players is not None:
+            msg.append(f"Changed: {len(players)} players")
+        for pid in (self.PlDict.keys() if players is None else players):
+            pl = self.PlDict[pid]
             msg.append(f"\tP{pid}: HP={pl.HP} E={pl.energy} Pos={pl.place} Team={pl.team}")
 
-        if self.ActSign:
+        if self.ActTable:
             msg.append(f"\nPending Actions:")
-            for priority in sorted(self.ActSign.keys(), reverse=True):
-                for act_key, acts in self.ActSign[priority].items():
-                    msg.append(f"  Priority {priority} / ActCode {act_key}: {len(acts)} actions")
+            for act_key in self.ActOrder:
+                if act_key in self.ActByKey:
+                    priority = self.ActDict[act_key]["priority"]
+                    msg.append(f"  Priority {priority} / ActCode {act_key}: {len(self.ActByKey[act_key])} actions")
 
         msg.append(f"{'='*60}")
 
         return "\n".join(msg)
 
 
+    def dump_profile(self, mode="l"):
+        """Writes the kernel profile (if profiling is enabled) to the given output channels."""
+        if profiler is not None:
+            self.ui.out(profiler.report(f"Kernel Profile - Round {self.rounds}"), mode=mode, dr=True, indent=False)
+
+
     def battle_env_snapshot(self, title="Battle Environment"):
         msg = []
         msg.append(f"{'='*60}")
@@ -886,6 +1855,7 @@ class Core():
 
         for env_key, env_value in self.BattleEnv.items():
             msg.append(f"\t{env_key} -> {env_value}")
+        msg.append(f"\tseed -> {self.seed}")
 
         msg.append(f"{'='*60}")
 
@@ -913,3 +1883,186 @@ class Event():
             core.RaiseError(self.domain, f"One Event object has happened but try to happend again (Type {self.type}).")
         self.has_happened = True
 
+
+
+def last_team_standing(core: Core):
+    """
+    The default game-over judge used by `Simulation`.
+
+    Returns:
+        None: If more than one team is still alive.
+        tuple: (winner_team, winner_id) once the battle is decided.
+               winner_id is only set when a single player survives;
+               (None, None) means nobody survived.
+    """
+    teams = [team for team in core.TeamTotals if team != "all"]
+    if len(teams) > 1:
+        return None
+    if not teams:
+        return (None, None)
+
+    if core.TeamTotals["all"][0] == 1:
+        return (teams[0], next(iter(core.PlDict)))
+    return (teams[0], None)
+
+
+class SimResult():
+    """The outcome of one headless `Simulation` run."""
+
+    def __init__(self, seed, rounds, outcome, roster, survivors, elapsed):
+        self.seed = seed           # The seed the run was started with.
+        self.rounds = rounds       # Number of rounds played.
+        self.elapsed = elapsed     # Wall time of the run in seconds.
+
+        # False if the run hit `max_rounds` (or was aborted) before a winner emerged.
+        self.finished = outcome is not None
+        self.winner_team, self.winner_id = outcome if outcome else (None, None)
+
+        # Per-player results, including eliminated players.
+        # Format: {player_id: {"team": int, "kills": int, "outd": int, "alive": bool}, ...}
+        self.players = {}
+        if isinstance(roster, PlayerStore):
+            # Read the columns directly, the store still holds eliminated players.
+            for pid in range(1, roster.size + 1):
+                self.players[pid] = {
+                    "team": roster.team[pid],
+                    "kills": len(roster.kills.get(pid, ())),
+                    "outd": roster.outd[pid],
+                    "alive": pid in survivors,
+                }
+        else:
+            for pid, pl in roster.items():
+                self.players[pid] = {
+                    "team": pl.team,
+                    "kills": len(pl.kills),
+                    "outd": pl.outd,
+                    "alive": pid in survivors,
+                }
+
+    def team_summary(self):
+        """
+        Aggregates the per-player results by team.
+
+        Returns:
+            dict: {team: {"kills": int, "outd": int, "alive": int, "size": int}, ...}
+        """
+        summary = {}
+        for res in self.players.values():
+            if res["team"] not in summary:
+                summary[res["team"]] = {"kills": 0, "outd": 0, "alive": 0, "size": 0}
+            summary[res["team"]]["kills"] += res["kills"]
+            summary[res["team"]]["outd"] += res["outd"]
+            summary[res["team"]]["alive"] += res["alive"]
+            summary[res["team"]]["size"] += 1
+        return summary
+
+    def rounds_per_sec(self):
+        return self.rounds / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class Simulation():
+    """
+    Runs a whole battle without a terminal attached: AI players only, no prompts,
+    no console output. It drives the same Core phases as an interactive game loop.
+
+    Usage:
+        sim = Simulation(BattleEnv, ActDict, CmdTable, seed=42)
+        result = sim.run()
+    """
+
+    def __init__(self, BattleEnv: dict, ActDict: dict, CmdTable: dict, seed=None,
+                 exp={}, logpath=None, judge=None, events=None, max_rounds=10000, CmdMemo=None,
+                 log_level="debug", snapshot_every=1, snapshot_changed=False):
+        """
+        Args:
+            BattleEnv (dict): Battle parameters. It is copied, and "real" is forced to 0.
+            ActDict (dict): The action dictionary of the game.
+            CmdTable (dict): The kernel command table of the game.
+            seed: Seed for the random number generator. None picks a fresh one.
+            exp (dict): Expression templates, used for log text and action names in `HPlog`.
+            logpath (str): Optional path of a gzip log. None (default) disables logging.
+            judge (func): judge(core) -> None while the battle goes on, or
+                          (winner_team, winner_id) once it is decided. Defaults to `last_team_standing`.
+                          It runs right after rm_deaths, before update_status, so it should read
+                          the live `TeamTotals` / `ControlTotals` rather than `status`.
+            events (list): Event objects to run before round 1 (e.g. pre-battle tweaks).
+            max_rounds (int): Safety cap on the number of rounds.
+            CmdMemo (dict): Optional memo keys of kernel commands (see Core.Exec).
+            log_level (str): The lowest level written to the log (see IO).
+            snapshot_every (int), snapshot_changed (bool): Sampling of the per-round
+                              game state snapshot (see Core.log_snapshot).
+        """
+        self.BattleEnv = dict(BattleEnv)
+        self.BattleEnv["real"] = 0
+        self.ActDict = ActDict
+        self.CmdTable = CmdTable
+        self.CmdMemo = CmdMemo if CmdMemo else {}
+        self.log_level = log_level
+        if snapshot_every < 1:
+            raise ValueError(f"snapshot_every must be at least 1, got {snapshot_every}")
+        self.snapshot_every = snapshot_every
+        self.snapshot_changed = snapshot_changed
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.exp = exp
+        self.logpath = logpath
+        self.judge = judge if judge else last_team_standing
+        self.events = events if events else []
+        self.max_rounds = max_rounds
+
+        self.core = None
+
+    def setup(self):
+        """Builds a fresh Core with its players, status and pre-battle events applied."""
+        ui = IO(self.exp, logpath=self.logpath, headless=True, log_level=self.log_level)
+        core = Core(self.BattleEnv, self.ActDict, ui, seed=self.seed)
+        core.CmdTable = self.CmdTable
+        core.CmdMemo = self.CmdMemo
+        core.snapshot_every = self.snapshot_every
+        core.snapshot_changed = self.snapshot_changed
+        core.ui.out(core.battle_env_snapshot(), mode="l", dr=True)
+
+        core.mk_pldict()
+        core.update_status()
+
+        for event in self.events:
+            event.has_happened = False
+            core.EventBus.append(event)
+        core.DealEvents()
+
+        self.core = core
+        return core
+
+    def step(self):
+        """Plays one round. Returns the judge's verdict (None while the battle goes on)."""
+        core = self.core
+        core.ui.write_log()
+        core.clean_round()
+        core.rounds += 1
+
+        core.SelectAct()
+        if core.exit_game:
+            return None
+
+        core.DealAct()
+        core.rm_deaths()
+
+        # The judges read the live team counters, so a decided battle skips the status update.
+        outcome = self.judge(core)
+        if outcome is None:
+            core.update_status()
+        return outcome
+
+    def run(self) -> SimResult:
+        """Plays the battle to completion (or `max_rounds`) and returns a SimResult."""
+        start = time.perf_counter()
+        core = self.setup()
+        # Keep eliminated players around for the result (a PlayerStore never forgets them).
+        roster = core.PlDict if isinstance(core.PlDict, PlayerStore) else dict(core.PlDict)
+
+        outcome = self.judge(core)
+        while outcome is None and core.rounds < self.max_rounds and not core.exit_game:
+            outcome = self.step()
+
+        core.dump_profile()
+        core.ui.close_log()
+        return SimResult(self.seed, core.rounds, outcome, roster, core.PlDict, time.perf_counter() - start)
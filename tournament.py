@@ -0,0 +1,195 @@
+"""
+Tournament Runner for Energy Battle
+
+Plays many seeded AI-only battles in parallel and summarizes the outcome.
+Useful to evaluate balance changes to `ark.BaseActDict` (prices, weights, AI functions).
+
+Usage:
+    python tournament.py -n 1000 -j 8 --set num=20 --set team_size=5
+    python tournament.py -n 200 --patch my_balance:apply --json result.json
+"""
+
+import argparse
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# The per-worker game state, built once by `_init_worker` and reused by every game.
+_worker = {}
+
+
+def _init_worker(env_overrides: dict, patch: str, max_rounds: int):
+    """
+    Warms up a worker process: imports the game, applies the optional balance patch
+    and builds the BattleEnv once, so each game only pays for the battle itself.
+    """
+    import ark
+    import noah
+
+    if patch:
+        module_name, func_name = patch.split(":", 1)
+        getattr(importlib.import_module(module_name), func_name)(ark)
+
+    env = dict(ark.InitBattleEnv)
+    env.update(env_overrides)
+    env["tweaks"] = []
+
+    _worker["ark"] = ark
+    _worker["noah"] = noah
+    _worker["env"] = env
+    _worker["max_rounds"] = max_rounds
+
+
+def play_game(seed: int) -> dict:
+    """
+    Plays one seeded battle inside a warm worker.
+
+    Returns:
+        dict: A compact, picklable summary of the battle.
+    """
+    ark = _worker["ark"]
+    noah = _worker["noah"]
+    sim = noah.Simulation(
+        _worker["env"], ark.BaseActDict, ark.CmdTable, seed=seed,
+        judge=ark.judge_game_over, max_rounds=_worker["max_rounds"], CmdMemo=ark.CmdMemo
+    )
+    res = sim.run()
+    return {
+        "seed": res.seed,
+        "rounds": res.rounds,
+        "finished": res.finished,
+        "winner_team": res.winner_team,
+        "teams": res.team_summary(),
+    }
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """
+    Aggregates the results of all games.
+
+    Returns:
+        dict: Wins per team, rounds-to-finish statistics, kills and damage per team, and throughput.
+    """
+    games = len(results)
+    wins = {}
+    teams = {}
+    rounds = []
+    unfinished = 0
+    nobody = 0
+
+    for res in results:
+        rounds.append(res["rounds"])
+        if not res["finished"]:
+            unfinished += 1
+        elif res["winner_team"] is None:
+            nobody += 1
+        else:
+            wins[res["winner_team"]] = wins.get(res["winner_team"], 0) + 1
+
+        for team, stat in res["teams"].items():
+            if team not in teams:
+                teams[team] = {"kills": 0, "outd": 0}
+            teams[team]["kills"] += stat["kills"]
+            teams[team]["outd"] += stat["outd"]
+
+    for team, stat in teams.items():
+        stat["wins"] = wins.get(team, 0)
+        stat["win_rate"] = stat["wins"] / games if games else 0
+        stat["kills_per_game"] = stat["kills"] / games if games else 0
+        stat["outd_per_game"] = stat["outd"] / games if games else 0
+
+    rounds.sort()
+    return {
+        "games": games,
+        "elapsed": elapsed,
+        "games_per_sec": games / elapsed if elapsed > 0 else 0,
+        "rounds_per_sec": sum(rounds) / elapsed if elapsed > 0 else 0,
+        "unfinished": unfinished,
+        "nobody_survived": nobody,
+        "rounds": {
+            "mean": sum(rounds) / games if games else 0,
+            "min": rounds[0] if rounds else 0,
+            "median": rounds[games // 2] if rounds else 0,
+            "max": rounds[-1] if rounds else 0,
+        },
+        "teams": {str(team): teams[team] for team in sorted(teams)},
+    }
+
+
+def run_tournament(games: int, seed: int = 0, workers: int = None, env_overrides: dict = None,
+                   patch: str = None, max_rounds: int = 10000) -> dict:
+    """
+    Fans `games` seeded battles out over a process pool. Game i uses seed `seed + i`,
+    so results don't depend on how the games are scheduled.
+
+    Args:
+        games (int): Number of battles to play.
+        seed (int): The seed of the first battle.
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+        env_overrides (dict): Values to override in `ark.InitBattleEnv`.
+        patch (str): Optional "module:function", called once per worker with the `ark` module.
+        max_rounds (int): Games still undecided after this many rounds count as unfinished.
+
+    Returns:
+        dict: See summarize().
+    """
+    workers = workers or os.cpu_count() or 1
+    seeds = range(seed, seed + games)
+    # Big enough chunks keep the IPC overhead away from short games.
+    chunksize = max(1, games // (workers * 8))
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(env_overrides or {}, patch, max_rounds)) as pool:
+        results = list(pool.map(play_game, seeds, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(results, elapsed)
+    summary["workers"] = workers
+    summary["first_seed"] = seed
+    return summary
+
+
+def parse_overrides(pairs: list) -> dict:
+    """Parses ["num=20", "map=2"] into {"num": 20, "map": 2}."""
+    overrides = {}
+    for pair in pairs:
+        key, value = pair.split("=", 1)
+        overrides[key.strip()] = int(value)
+    return overrides
+
+
+def print_summary(summary: dict):
+    print(f"{summary['games']} games in {summary['elapsed']:.2f}s on {summary['workers']} workers "
+          f"({summary['games_per_sec']:.1f} games/sec, {summary['rounds_per_sec']:.0f} rounds/sec)")
+    r = summary["rounds"]
+    print(f"Rounds to finish: mean {r['mean']:.1f} / min {r['min']} / median {r['median']} / max {r['max']}")
+    if summary["unfinished"] or summary["nobody_survived"]:
+        print(f"Unfinished: {summary['unfinished']}  Nobody survived: {summary['nobody_survived']}")
+    print(f"{'Team':>6} {'Wins':>7} {'Win%':>7} {'Kills/g':>9} {'Dmg/g':>9}")
+    for team, stat in summary["teams"].items():
+        print(f"{team:>6} {stat['wins']:>7} {stat['win_rate']*100:>6.1f}% "
+              f"{stat['kills_per_game']:>9.2f} {stat['outd_per_game']:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many seeded AI-only Energy Battle games in parallel.")
+    parser.add_argument("-n", "--games", type=int, default=100, help="number of games")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a BattleEnv value, e.g. --set num=20")
+    parser.add_argument("--patch", default=None, metavar="MODULE:FUNC",
+                        help="function called with the ark module in every worker, to apply balance changes")
+    parser.add_argument("--max-rounds", type=int, default=10000, help="round cap per game")
+    parser.add_argument("--json", default=None, metavar="PATH", help="also write the summary as JSON")
+    args = parser.parse_args()
+
+    summary = run_tournament(args.games, args.seed, args.workers, parse_overrides(args.set), args.patch, args.max_rounds)
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)